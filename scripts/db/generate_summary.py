@@ -1,156 +1,236 @@
 import argparse
-import csv
 import logging
 import os
 import sqlite3
+from collections import defaultdict
 
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:  # Optional, only needed for Feather/Parquet output
+    pyarrow = None
+
+from scripts.db.sqlite_writer import ensure_rollups
 from scripts.logging.custom_logging import setup_logger
 from scripts.util.load_env import load_github_env_vars
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../out/summaries"))
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+TABLES = ["issues", "pull_requests"]
+SUMMARY_KINDS = ["open_by_label", "monthly_summary", "label_breakdown", "label_counts"]
+DISCUSSION_KINDS = ["monthly_summary"]  # Discussions have categories rather than labels
+# Output format -> file suffix. Columnar formats keep column types, so loading them skips CSV parsing.
+FORMAT_SUFFIXES = {
+    "csv": ".csv",
+    "feather": ".feather",
+    "parquet": ".parquet",
+}
+# Everything the summaries read
+SOURCE_TABLES = ["labels", "monthly_state_rollup", "monthly_label_rollup", "monthly_discussion_rollup"]
+
+# One pass over the monthly rollups maintained by sqlite_writer (drafts are already excluded).
+# Rows with a NULL label carry per-item state counts, the others per item-label pair counts.
+SUMMARY_STREAM = """
+    SELECT month, state, NULL AS label_name, count
+    FROM monthly_state_rollup
+    WHERE tbl = ?
+    UNION ALL
+    SELECT r.month, r.state, labels.name, r.count
+    FROM monthly_label_rollup r
+    JOIN labels ON labels.id = r.label_id
+    WHERE r.tbl = ?
+"""
+
+DISCUSSION_STREAM = "SELECT month, category, state, count FROM monthly_discussion_rollup"
+
+
+class TableSummary:
+    """Shared aggregates for one table, from which every summary CSV is emitted."""
+
+    def __init__(self, table):
+        self.table = table
+        self.month_states = defaultdict(lambda: {"open": 0, "closed": 0})  # month -> items by state
+        self.label_states = defaultdict(lambda: {"open": 0, "closed": 0})  # label -> items by state
+        self.month_labels = defaultdict(int)  # (month, label) -> items
+
+    def add(self, month, state, label_name, count):
+        if label_name is None:
+            self.month_states[month][state] = self.month_states[month].get(state, 0) + count
+            return
+        self.label_states[label_name][state] = self.label_states[label_name].get(state, 0) + count
+        self.month_labels[(month, label_name)] += count
+
+    def label_totals(self):
+        return {label: sum(states.values()) for label, states in self.label_states.items()}
+
+
+def build_summary(cur, table):
+    logging.info(f"Aggregating summaries for table '{table}' in a single pass...")
+    summary = TableSummary(table)
+    cur.execute(SUMMARY_STREAM, (table, table))
+    for month, state, label_name, count in cur:
+        summary.add(month, state, label_name, count)
+    logging.info(f"Found {len(summary.label_states)} labels over {len(summary.month_states)} months "
+                 f"for table '{table}'")
+    return summary
+
+
+def output_path(env, table, kind, fmt="csv"):
+    return os.path.join(OUTPUT_DIR, f"{env['REPO_OWNER']}_{env['REPO_NAME']}_{table}.{kind}{FORMAT_SUFFIXES[fmt]}")
+
 
+def parse_formats(formats):
+    """Validate a comma-separated list (or sequence) of output formats; "none" writes no files."""
+    if isinstance(formats, str):
+        formats = [fmt.strip() for fmt in formats.split(",") if fmt.strip() and fmt.strip() != "none"]
+    for fmt in formats:
+        if fmt not in FORMAT_SUFFIXES:
+            raise ValueError(f"Unknown summary format '{fmt}', expected one of {', '.join(FORMAT_SUFFIXES)}")
+        if fmt != "csv" and pyarrow is None:
+            raise ImportError(f"Writing {fmt} summaries requires the 'pyarrow' package.")
+    return list(formats)
 
-def export_monthly_summary(env, cur, table):
-    logging.info(f"Executing dynamic monthly summary with all labels for table '{table}'...")
-    output_path = os.path.join(OUTPUT_DIR, f"{env["REPO_OWNER"]}_{env["REPO_NAME"]}_{table}.monthly_summary.csv")
-    where_clause = "WHERE is_draft = 0" if table == "pull_requests" else ""
-
-    # Step 1: Get all distinct label names used with this table
-    cur.execute(f"""
-        SELECT DISTINCT labels.name
-        FROM issue_labels
-        JOIN labels ON labels.id = issue_labels.label_id
-        JOIN {table} ON {table}.id = issue_labels.issue_id
-        {where_clause}
-    """)
-    label_names = [row[0] for row in cur.fetchall()]
-    logging.info(f"Found {len(label_names)} labels for table '{table}'")
-
-    # Step 2: Build dynamic SUM(CASE ...) blocks for each label
-    label_columns_sql = ",\n        ".join(
-        [f"SUM(CASE WHEN lc.label_name = '{label}' THEN 1 ELSE 0 END) AS \"{label}\""
-         for label in label_names]
+
+def write_frame(df, path, fmt):
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "feather":
+        df.to_feather(path)
+    else:
+        df.to_parquet(path, index=False)
+
+
+def monthly_summary_frame(summary):
+    """Pivot the long-format (month, label, count) aggregates into one column per label.
+
+    Only the non-zero cells are ever materialized in Python; the dense month x label matrix is
+    filled in by pandas, so the cost scales with the data rather than months x labels.
+    """
+    table = summary.table
+    states = pd.DataFrame.from_dict(summary.month_states, orient="index", columns=["open", "closed"])
+    states.columns = [f"open_{table}", f"closed_{table}"]
+
+    long = pd.DataFrame(
+        [(month, label, count) for (month, label), count in summary.month_labels.items()],
+        columns=["month", "label_name", "count"],
     )
+    labels = long.pivot(index="month", columns="label_name", values="count")
+
+    # Label columns are ordered by overall volume. Open/closed columns count items, label
+    # columns count item-label pairs.
+    totals = summary.label_totals()
+    label_names = sorted(totals, key=lambda label: (-totals[label], label))
 
-    # Step 3: Build final SQL query
-    query = f"""
-    WITH month_base AS (
-        SELECT
-            substr(created_at, 1, 7) AS month,
-            id AS issue_id,
-            state
-        FROM {table}
-        {where_clause}
-    ),
-    label_counts AS (
-        SELECT
-            issue_labels.issue_id,
-            labels.name AS label_name
-        FROM issue_labels
-        JOIN labels ON labels.id = issue_labels.label_id
-        JOIN {table} ON {table}.id = issue_labels.issue_id
-        {where_clause}
+    df = states.join(labels.reindex(columns=label_names), how="left").fillna(0).astype("int64")
+    df.index.name = "month"
+    return df.sort_index().reset_index()
+
+
+def label_breakdown_frame(summary):
+    totals = summary.label_totals()
+    rows = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+    return pd.DataFrame(rows, columns=["label_name", "count"])
+
+
+def label_timeseries_frame(summary):
+    rows = sorted(
+        ((month, label, count) for (month, label), count in summary.month_labels.items()),
+        key=lambda row: (row[0], -row[2], row[1]),
     )
-    SELECT
-        mb.month,
-        SUM(CASE WHEN mb.state = 'open' THEN 1 ELSE 0 END) AS open_{table},
-        SUM(CASE WHEN mb.state = 'closed' THEN 1 ELSE 0 END) AS closed_{table},
-        {label_columns_sql}
-    FROM month_base mb
-    LEFT JOIN label_counts lc ON mb.issue_id = lc.issue_id
-    GROUP BY mb.month
-    ORDER BY mb.month
-    """
+    return pd.DataFrame(rows, columns=["month", "label_name", "count"])
 
-    cur.execute(query)
-    rows = cur.fetchall()
-    column_names = [desc[0] for desc in cur.description]
-
-    logging.info(f"Writing expanded monthly summary to {output_path}")
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(column_names)
-        writer.writerows(rows)
-
-
-def export_label_breakdown(env, cur, table):
-    logging.info(f"Executing label breakdown query for table '{table}'...")
-    output_path = os.path.join(OUTPUT_DIR, f"{env["REPO_OWNER"]}_{env["REPO_NAME"]}_{table}.label_breakdown.csv")
-    where_clause = "WHERE is_draft = 0" if table == "pull_requests" else ""
-
-    query = f"""
-    SELECT labels.name AS label_name, COUNT(*) AS count
-    FROM issue_labels
-    JOIN labels ON labels.id = issue_labels.label_id
-    JOIN {table} ON {table}.id = issue_labels.issue_id
-    {where_clause}
-    GROUP BY labels.name
-    ORDER BY count DESC
-    """
-    cur.execute(query)
-    rows = cur.fetchall()
-
-    logging.info(f"Writing label breakdown to {output_path}")
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["label_name", "count"])
-        writer.writerows(rows)
-
-
-def export_label_timeseries(env, cur, table):
-    logging.info(f"Executing label time-series breakdown query for table '{table}'...")
-    output_path = os.path.join(OUTPUT_DIR, f"{env["REPO_OWNER"]}_{env["REPO_NAME"]}_{table}.label_counts.csv")
-    where_clause = "WHERE is_draft = 0" if table == "pull_requests" else ""
-
-    query = f"""
-    SELECT
-        substr({table}.created_at, 1, 7) AS month,
-        labels.name AS label_name,
-        COUNT(*) AS count
-    FROM {table}
-    JOIN issue_labels ON {table}.id = issue_labels.issue_id
-    JOIN labels ON labels.id = issue_labels.label_id
-    {where_clause}
-    GROUP BY month, label_name
-    ORDER BY month, count DESC
+
+def open_by_label_frame(summary):
+    rows = sorted(
+        ((label, states["open"], states["closed"]) for label, states in summary.label_states.items()),
+        key=lambda row: (-row[1], -row[2], row[0]),
+    )
+    return pd.DataFrame(rows, columns=["label_name", "open_count", "closed_count"])
+
+
+def discussion_summary_frame(cur):
+    """Monthly discussion counts: the total, answered and unanswered (in answerable categories
+    only, see `refresh_discussion_rollup`), then one column per category ordered by overall
+    volume. None without discussions."""
+    cur.execute(DISCUSSION_STREAM)
+    long = pd.DataFrame(cur.fetchall(), columns=["month", "category", "state", "count"])
+    if long.empty:
+        return None
+
+    states = long.pivot_table(index="month", columns="state", values="count", aggfunc="sum")
+    categories = long.pivot_table(index="month", columns="category", values="count", aggfunc="sum")
+    totals = categories.sum()
+    category_names = sorted(totals.index, key=lambda category: (-totals[category], category))
+
+    df = pd.DataFrame({"discussions": long.groupby("month")["count"].sum()})
+    df = (df.join(states.reindex(columns=["answered", "unanswered"]))
+          .join(categories.reindex(columns=category_names))
+          .fillna(0)
+          .astype("int64"))
+    df.index.name = "month"
+    return df.sort_index().reset_index()
+
+
+# Summary kind -> (frame builder, description used in log messages)
+SUMMARY_FRAMES = {
+    "open_by_label": (open_by_label_frame, "open-by-label breakdown"),
+    "monthly_summary": (monthly_summary_frame, "expanded monthly summary"),
+    "label_breakdown": (label_breakdown_frame, "label breakdown"),
+    "label_counts": (label_timeseries_frame, "label time-series"),
+}
+
+
+def summary_frames(summary):
+    """Return every summary of one table as {kind: DataFrame}, each with a default index and
+    exactly the columns of its file, so in-memory and loaded summaries are interchangeable."""
+    return {kind: SUMMARY_FRAMES[kind][0](summary) for kind in SUMMARY_KINDS}
+
+
+def build_summary_frames(db_path):
+    """Aggregate `db_path` into {table: {kind: DataFrame}} without writing anything.
+
+    This is the in-process API: the plot stage can consume the frames directly, and files
+    are only written by `write_summaries` when a sink format is requested.
     """
-    cur.execute(query)
-    rows = cur.fetchall()
-
-    logging.info(f"Writing label time-series to {output_path}")
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["month", "label_name", "count"])
-        writer.writerows(rows)
-
-
-def export_open_by_label(env, cur, table):
-    logging.info(f"Calculating open {table} count by label...")
-    output_path = os.path.join(OUTPUT_DIR, f"{env["REPO_OWNER"]}_{env["REPO_NAME"]}_{table}.open_by_label.csv")
-    where_clause = "WHERE is_draft = 0" if table == "pull_requests" else ""
-
-    query = f"""
-       SELECT
-           labels.name AS label_name,
-           SUM(CASE WHEN {table}.state = 'open' THEN 1 ELSE 0 END) AS open_count,
-           SUM(CASE WHEN {table}.state = 'closed' THEN 1 ELSE 0 END) AS closed_count
-       FROM {table}
-       JOIN issue_labels ON {table}.id = issue_labels.issue_id
-       JOIN labels ON labels.id = issue_labels.label_id
-       {where_clause}
-       GROUP BY labels.name
-       ORDER BY open_count DESC, closed_count DESC
-       """
-    cur.execute(query)
-    rows = cur.fetchall()
-
-    logging.info(f"Writing open-by-label breakdown to {output_path}")
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["label_name", "open_count", "closed_count"])
-        writer.writerows(rows)
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_rollups(conn)
+        cur = conn.cursor()
+        frames = {table: summary_frames(build_summary(cur, table)) for table in TABLES}
+        discussions = discussion_summary_frame(cur)
+        if discussions is not None:
+            frames["discussions"] = {"monthly_summary": discussions}
+        return frames
+    finally:
+        conn.close()
+
+
+def write_summaries(env, frames, formats=("csv",)):
+    """Write summary frames into OUTPUT_DIR, once per output format."""
+    for table, table_frames in frames.items():
+        for kind, df in table_frames.items():
+            description = SUMMARY_FRAMES[kind][1]
+            for fmt in formats:
+                path = output_path(env, table, kind, fmt)
+                logging.info(f"Writing {description} to {path}")
+                write_frame(df, path, fmt)
+
+
+def generate_summaries(env, db_path, formats=("csv",)):
+    """Build every summary for `db_path`, write it in each of `formats` and return the frames."""
+    formats = parse_formats(formats)
+    frames = build_summary_frames(db_path)
+    write_summaries(env, frames, formats)
+    return frames
+
+
+def summary_paths(env, formats=("csv",)):
+    """Return the paths of every file written by `generate_summaries` (discussions only if any)."""
+    paths = [output_path(env, table, kind, fmt) for table in TABLES for kind in SUMMARY_KINDS for fmt in formats]
+    paths += [output_path(env, "discussions", kind, fmt) for kind in DISCUSSION_KINDS for fmt in formats]
+    return paths
 
 
 def main():
@@ -163,6 +243,11 @@ def main():
         type=str,
         help="Path to the .env file to load environment variables from",
     )
+    parser.add_argument(
+        "--formats",
+        default="csv",
+        help="Comma-separated output formats: csv, feather, parquet (columnar formats need pyarrow)",
+    )
     args = parser.parse_args()
 
     try:
@@ -171,18 +256,14 @@ def main():
         print(f"Error loading environment variables: {e}")
         return 1
 
-    db_path = args.db
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-
-    for table in ["issues", "pull_requests"]:
-        export_open_by_label(env, cur, table)
-        export_monthly_summary(env, cur, table)
-        export_label_breakdown(env, cur, table)
-        export_label_timeseries(env, cur, table)
+    try:
+        formats = parse_formats(args.formats)
+    except (ValueError, ImportError) as e:
+        print(f"Error: {e}")
+        return 1
 
-    conn.close()
-    logging.info("Done. All CSVs saved.")
+    generate_summaries(env, args.db, formats)
+    logging.info(f"Done. All summaries saved as {', '.join(formats)}.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from scripts.db import sqlite_writer
+from scripts.util.load_env import load_github_env_vars
+
+SEARCH_TABLES = ["issues", "pull_requests", "discussions"]
+DEFAULT_LIMIT = 20
+SNIPPET_TOKENS = 16  # Words of context around the matches in each snippet
+TITLE_WEIGHT = 10.0  # bm25 weight of a title match relative to a body match
+
+# The `search_index` MATCH and bm25 ranking, joined back to the rows the documents came from.
+SEARCH_QUERY = """
+    SELECT documents.tbl,
+           COALESCE(issues.number, pull_requests.number, discussions.number) AS number,
+           COALESCE(issues.title, pull_requests.title, discussions.title) AS title,
+           COALESCE(issues.state, pull_requests.state, discussions.category) AS state,
+           snippet(search_index, 1, '[', ']', '...', {snippet_tokens}) AS snippet,
+           bm25(search_index, {title_weight}, 1.0) AS score
+    FROM search_index
+    JOIN search_documents documents ON documents.rowid = search_index.rowid
+    LEFT JOIN issues ON documents.tbl = 'issues' AND issues.id = documents.item_id
+    LEFT JOIN pull_requests ON documents.tbl = 'pull_requests' AND pull_requests.id = documents.item_id
+    LEFT JOIN discussions ON documents.tbl = 'discussions' AND discussions.number = documents.item_id
+    WHERE search_index MATCH ? AND documents.tbl IN ({tables})
+    ORDER BY score
+    LIMIT ?
+"""
+
+
+def match_expression(text):
+    """Turn free text into an FTS5 query matching items that contain every word, so that
+    punctuation such as `std::fmt` or `-` is not read as query syntax."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def search(db_path, text, limit=DEFAULT_LIMIT, tables=SEARCH_TABLES, raw=False):
+    """Return the `limit` best matches for `text` in the titles and bodies of `tables`, best first.
+
+    `raw` passes `text` through as an FTS5 query (phrases, OR, NEAR, prefix*). Each match is a
+    dict with the source table, number, title, state (the category for discussions), a body
+    snippet with the matched terms in brackets, and its bm25 score (lower is better).
+    """
+    query = SEARCH_QUERY.format(
+        snippet_tokens=SNIPPET_TOKENS,
+        title_weight=TITLE_WEIGHT,
+        tables=", ".join("?" for _ in tables),
+    )
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(query, [text if raw else match_expression(text), *tables, limit])
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over issue, pull request and discussion titles and bodies.")
+    parser.add_argument("query", help="Words that must all appear, or an FTS5 query with --raw.")
+    parser.add_argument("--db", help="Path to the SQLite database (default: out/db/<owner>_<repo>.db).")
+    parser.add_argument(
+        "--table",
+        action="append",
+        choices=SEARCH_TABLES,
+        help="Only search this table; can be repeated (default: all of them).",
+    )
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Maximum number of matches to show.")
+    parser.add_argument("--raw", action="store_true", help="Pass the query through as FTS5 query syntax.")
+    parser.add_argument(
+        "--env-file",
+        type=str,
+        help="Path to the .env file to load environment variables from",
+    )
+    args = parser.parse_args()
+
+    db_path = args.db
+    if db_path is None:
+        try:
+            env = load_github_env_vars(args.env_file) if args.env_file else load_github_env_vars()
+        except ValueError as e:
+            print(f"Error loading environment variables: {e}")
+            return 1
+        db_path = os.path.join(sqlite_writer.OUTPUT_DIR, f"{env['REPO_OWNER']}_{env['REPO_NAME']}.db")
+    if not os.path.exists(db_path):
+        print(f"Error: No database at {db_path}")
+        return 1
+
+    started = time.perf_counter()
+    try:
+        matches = search(db_path, args.query, limit=args.limit, tables=args.table or SEARCH_TABLES, raw=args.raw)
+    except sqlite3.OperationalError as e:
+        print(f"Error searching {db_path}: {e}")
+        return 1
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for match in matches:
+        print(f"[{match['tbl']} #{match['number']}] ({match['state']}) {match['title']}")
+        if match["snippet"]:
+            print(f"    {' '.join(match['snippet'].split())}")
+    print(f"{len(matches)} matches in {elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
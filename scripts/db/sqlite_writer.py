@@ -1,18 +1,50 @@
 import argparse
+import itertools
 import json
 import os
 import sqlite3
+import time
 
 from scripts.logging.custom_logging import setup_logger
+from scripts.util.archive import iter_archive
 from scripts.util.load_env import load_github_env_vars
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../out/db"))
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+INSERT_BATCH_SIZE = 1000  # Issues and pull requests buffered before each executemany
+
+# PRAGMAs applied for the duration of a load. A full load writes a throwaway temp file that
+# only replaces the real database once committed, so it can skip fsyncs entirely; an
+# incremental load writes the live database and keeps WAL's crash safety.
+LOAD_PROFILES = {
+    "bulk": {
+        "full": {"journal_mode": "WAL", "synchronous": "OFF", "cache_size": -262144, "temp_store": "MEMORY"},
+        "incremental": {"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -262144, "temp_store": "MEMORY"},
+    },
+    "default": {"full": {}, "incremental": {}},
+}
+
+# Secondary indexes for the summary queries, built after the bulk insert.
+INDEXES = {
+    "idx_issue_labels_label": "issue_labels(label_id, issue_id)",
+    "idx_issues_created_at": "issues(created_at)",
+    "idx_issues_state": "issues(state)",
+    "idx_pull_requests_draft_created_at": "pull_requests(is_draft, created_at)",
+    "idx_labels_name": "labels(name)",
+    "idx_discussions_created_at": "discussions(created_at)",
+}
+
+
+# Items counted by the summaries and rollups; draft pull requests are left out.
+SUMMARY_FILTERS = {
+    "issues": "1 = 1",
+    "pull_requests": "is_draft = 0",
+}
 
 
 def create_tables(cur):
-    print("Creating database tables (issues, pull_requests, labels, issue_labels)...")
+    print("Creating database tables (issues, pull_requests, labels, issue_labels, discussions, rollups, search index)...")
 
     common_schema = """
         id INTEGER PRIMARY KEY,
@@ -33,7 +65,8 @@ def create_tables(cur):
     cur.execute(f"""
         CREATE TABLE IF NOT EXISTS pull_requests(
             {common_schema},
-            is_draft BOOLEAN
+            is_draft BOOLEAN,
+            head_ref TEXT
         )
     """)
     cur.execute("""
@@ -51,121 +84,527 @@ def create_tables(cur):
             PRIMARY KEY (issue_id, label_id)
         )
     """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS discussions(
+            number INTEGER PRIMARY KEY,
+            title TEXT,
+            category TEXT,
+            is_answerable BOOLEAN,
+            is_answered BOOLEAN,
+            locked BOOLEAN,
+            upvote_count INTEGER,
+            comment_count INTEGER,
+            created_at TEXT,
+            updated_at TEXT,
+            user_login TEXT,
+            url TEXT
+        )
+    """)
+    # Pre-aggregated monthly counts for generate_summary, keyed by the source table name.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_state_rollup(
+            tbl TEXT,
+            month TEXT,
+            state TEXT,
+            count INTEGER,
+            PRIMARY KEY (tbl, month, state)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_label_rollup(
+            tbl TEXT,
+            month TEXT,
+            label_id INTEGER,
+            state TEXT,
+            count INTEGER,
+            PRIMARY KEY (tbl, month, label_id, state)
+        )
+    """)
+    # state is 'answered' or 'unanswered' in answerable (Q&A-style) categories, else 'unanswerable'
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_discussion_rollup(
+            month TEXT,
+            category TEXT,
+            state TEXT,
+            count INTEGER,
+            PRIMARY KEY (month, category, state)
+        )
+    """)
+    # Full-text index over the titles and bodies of all three tables. Bodies are only stored
+    # here; search_documents maps each index rowid to its source table and id (the
+    # discussion number for discussions).
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS search_documents(
+            tbl TEXT,
+            item_id INTEGER,
+            UNIQUE (tbl, item_id)
+        )
+    """)
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            title,
+            body,
+            tokenize = 'porter unicode61'
+        )
+    """)
     print("Database tables created successfully.")
 
 
-def write_issues_to_sqlite(issues, output_dir, repo_owner, repo_name):
-    db_filename = f"{repo_owner}_{repo_name}.db"
-    db_path = os.path.join(output_dir, db_filename)
+def refresh_rollups(cur, affected_months=None):
+    """Recompute the monthly rollups from the fact tables.
 
-    if os.path.exists(db_path):
-        print(f"Deleting database at {db_path}...")
-        os.remove(db_path)
-    print(f"Setting up SQLite database at {db_path}...")
+    `affected_months` maps a table name to the set of `YYYY-MM` months whose items changed;
+    only those months are recomputed. With None, the rollups are rebuilt from scratch.
+    """
+    for table, where in SUMMARY_FILTERS.items():
+        if affected_months is None:
+            cur.execute("DELETE FROM monthly_state_rollup WHERE tbl = ?", (table,))
+            cur.execute("DELETE FROM monthly_label_rollup WHERE tbl = ?", (table,))
+            month_filters = [("", ())]
+        else:
+            months = sorted(affected_months.get(table, ()))
+            cur.executemany("DELETE FROM monthly_state_rollup WHERE tbl = ? AND month = ?",
+                            [(table, month) for month in months])
+            cur.executemany("DELETE FROM monthly_label_rollup WHERE tbl = ? AND month = ?",
+                            [(table, month) for month in months])
+            # A range on created_at (rather than substr()) lets SQLite use the created_at index.
+            # '~' sorts after every character of an ISO 8601 timestamp.
+            month_filters = [(f"AND {table}.created_at >= ? AND {table}.created_at < ?", (month, f"{month}~"))
+                             for month in months]
+
+        for month_filter, params in month_filters:
+            cur.execute(f"""
+                INSERT INTO monthly_state_rollup(tbl, month, state, count)
+                SELECT ?, substr(created_at, 1, 7) AS month, state, COUNT(*)
+                FROM {table}
+                WHERE {where} {month_filter}
+                GROUP BY month, state
+            """, (table,) + params)
+            cur.execute(f"""
+                INSERT INTO monthly_label_rollup(tbl, month, label_id, state, count)
+                SELECT ?, substr({table}.created_at, 1, 7) AS month, issue_labels.label_id, {table}.state, COUNT(*)
+                FROM {table}
+                JOIN issue_labels ON issue_labels.issue_id = {table}.id
+                WHERE {where} {month_filter}
+                GROUP BY month, issue_labels.label_id, {table}.state
+            """, (table,) + params)
+
+
+def refresh_discussion_rollup(cur):
+    """Recompute the monthly discussion counts. Discussions are few enough to always rebuild.
+
+    GitHub reports isAnswered false for every discussion outside answerable categories, so only
+    those count as answered or unanswered. Archives fetched before `is_answerable` was recorded
+    leave it NULL; a category then counts as answerable if any of its discussions was answered.
+    """
+    cur.execute("DELETE FROM monthly_discussion_rollup")
+    cur.execute("""
+        INSERT INTO monthly_discussion_rollup(month, category, state, count)
+        SELECT substr(created_at, 1, 7) AS month,
+               COALESCE(category, '') AS category,
+               CASE
+                   WHEN NOT COALESCE(
+                       is_answerable,
+                       category IN (SELECT category FROM discussions WHERE is_answered = 1),
+                       0
+                   ) THEN 'unanswerable'
+                   WHEN is_answered = 1 THEN 'answered'
+                   WHEN is_answered = 0 THEN 'unanswered'
+                   ELSE 'unanswerable'
+               END AS state,
+               COUNT(*)
+        FROM discussions
+        GROUP BY month, category, state
+    """)
 
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
 
+def ensure_rollups(conn):
+    """Create and populate the rollups of a database loaded before they existed."""
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing = {row[0] for row in cur.fetchall()}
+    if {"monthly_label_rollup", "monthly_discussion_rollup"} <= existing:
+        return
+    print("Database has no rollup tables yet, building them...")
     create_tables(cur)
+    ensure_columns(cur)
+    if "monthly_label_rollup" not in existing:
+        refresh_rollups(cur)
+    refresh_discussion_rollup(cur)
+    conn.commit()
 
-    issue_rows = []
-    pr_rows = []
-    label_map = {}
-    issue_label_rows = []
-
-    for issue in issues:
-        issue_id = issue.get("id")
-        number = issue.get("number")
-        title = issue.get("title")
-        state = issue.get("state")
-        created_at = issue.get("created_at")
-        updated_at = issue.get("updated_at")
-        closed_at = issue.get("closed_at")
-        user_login = issue.get("user", {}).get("login") if issue.get("user") else None
-
-        row = (issue_id, number, title, state, created_at, updated_at, closed_at, user_login)
-
-        # GitHub API is funny, it returns issues and pull requests in the same endpoint.
-        if "pull_request" in issue:
-            is_draft = issue.get("draft", False)
-            pr_row = row + (is_draft,)
-            pr_rows.append(pr_row)
-        else:
-            issue_rows.append(row)
-
-        labels = issue.get("labels", [])
-        for label in labels:
-            lbl_id = label.get("id")
-            name = label.get("name")
-            color = label.get("color")
-            desc = label.get("description")
-            if lbl_id is not None and lbl_id not in label_map:
-                label_map[lbl_id] = (lbl_id, name, color, desc)
-            if lbl_id is not None:
-                issue_label_rows.append((issue_id, lbl_id))
-
-    print("Inserting issues into database...")
-    if issue_rows:
-        cur.executemany("""
-            INSERT INTO issues(id, number, title, state, created_at, updated_at, closed_at, user_login)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, issue_rows)
-    print(f"Inserted {len(issue_rows)} issues into the database.")
-
-    print("Inserting pull requests into database...")
-    if pr_rows:
-        cur.executemany("""
-            INSERT INTO pull_requests(id, number, title, state, created_at, updated_at, closed_at, user_login, is_draft)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, pr_rows)
-    print(f"Inserted {len(pr_rows)} pull requests into the database.")
-
-    print("Inserting labels into database...")
-    label_rows = list(label_map.values())
-    if label_rows:
-        cur.executemany("""
-            INSERT INTO labels(id, name, color, description)
-            VALUES (?, ?, ?, ?)
-        """, label_rows)
-    print(f"Inserted {len(label_rows)} labels into the database.")
-
-    print("Inserting issue-label relationships into database...")
-    unique_issue_label_rows = list({(iid, lid) for (iid, lid) in issue_label_rows})
-    if unique_issue_label_rows:
-        cur.executemany("""
-            INSERT INTO issue_labels(issue_id, label_id)
-            VALUES (?, ?)
-        """, unique_issue_label_rows)
-    print(f"Inserted {len(unique_issue_label_rows)} issue-label records into the database.")
 
-    conn.commit()
+ISSUE_COLUMNS = ["id", "number", "title", "state", "created_at", "updated_at", "closed_at", "user_login"]
+PR_COLUMNS = ISSUE_COLUMNS + ["is_draft", "head_ref"]
+LABEL_COLUMNS = ["id", "name", "color", "description"]
+DISCUSSION_COLUMNS = ["number", "title", "category", "is_answerable", "is_answered", "locked", "upvote_count",
+                      "comment_count", "created_at", "updated_at", "user_login", "url"]
+
+
+def ensure_columns(cur):
+    """Add the columns introduced since a database was first created."""
+    cur.execute("SELECT name FROM pragma_table_info('pull_requests')")
+    if "head_ref" not in {row[0] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE pull_requests ADD COLUMN head_ref TEXT")
+    cur.execute("SELECT name FROM pragma_table_info('discussions')")
+    if "is_answerable" not in {row[0] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE discussions ADD COLUMN is_answerable BOOLEAN")
+
+
+def head_ref(issue, repo_owner, repo_name):
+    """Return the head branch of a pull request opened from `repo_owner/repo_name` itself, else None.
+    Only archives fetched through GraphQL carry the head of pull requests."""
+    head = issue.get("head") or {}
+    repo = head.get("repo") or {}
+    if repo.get("full_name", "").lower() != f"{repo_owner}/{repo_name}".lower():
+        return None
+    return head.get("ref")
+
+
+def apply_load_profile(conn, profile, incremental):
+    pragmas = LOAD_PROFILES[profile]["incremental" if incremental else "full"]
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    if pragmas:
+        print(f"Applied '{profile}' load profile: {pragmas}")
+
+
+def create_indexes(cur, incremental):
+    """Create the secondary indexes and refresh the planner statistics."""
+    print(f"Building {len(INDEXES)} secondary indexes...")
+    for name, target in INDEXES.items():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    # A full ANALYZE is cheap right after a bulk load; afterwards let SQLite decide what is stale.
+    cur.execute("PRAGMA optimize" if incremental else "ANALYZE")
+    if not incremental:
+        # Merge the index segments written batch by batch into one b-tree for faster queries.
+        cur.execute("INSERT INTO search_index(search_index) VALUES ('optimize')")
+
+
+def upsert_sql(table, columns, key="id"):
+    """Build an `INSERT ... ON CONFLICT(key) DO UPDATE` statement for `columns` of `table`."""
+    placeholders = ", ".join("?" for _ in columns)
+    updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col != key)
+    return f"""
+        INSERT INTO {table}({", ".join(columns)})
+        VALUES ({placeholders})
+        ON CONFLICT({key}) DO UPDATE SET {updates}
+    """
+
+
+def index_documents(cur, documents):
+    """Add or replace `(tbl, item_id, title, body)` documents in the full-text search index."""
+    keys = [(tbl, item_id) for tbl, item_id, _, _ in documents]
+    cur.executemany("INSERT OR IGNORE INTO search_documents(tbl, item_id) VALUES (?, ?)", keys)
+    cur.executemany("""
+        DELETE FROM search_index
+        WHERE rowid = (SELECT rowid FROM search_documents WHERE tbl = ? AND item_id = ?)
+    """, keys)
+    cur.executemany("""
+        INSERT INTO search_index(rowid, title, body)
+        SELECT rowid, ?, ? FROM search_documents WHERE tbl = ? AND item_id = ?
+    """, [(title or "", body or "", tbl, item_id) for tbl, item_id, title, body in documents])
+
+
+def discussion_row(discussion):
+    """Flatten a GraphQL discussion node (as archived by fetch_all_discussions) into a row."""
+    author = discussion.get("author") or {}
+    category = discussion.get("category") or {}
+    comments = discussion.get("comments") or {}
+    return (
+        discussion.get("number"),
+        discussion.get("title"),
+        category.get("name"),
+        category.get("isAnswerable"),
+        discussion.get("isAnswered"),
+        discussion.get("locked"),
+        discussion.get("upvoteCount"),
+        comments.get("totalCount"),
+        discussion.get("createdAt"),
+        discussion.get("updatedAt"),
+        author.get("login"),
+        discussion.get("url"),
+    )
+
+
+def load_discussions(cur, discussions):
+    """Upsert `discussions` (any iterable of archived discussions) in batches. Returns the count."""
+    sql = upsert_sql("discussions", DISCUSSION_COLUMNS, key="number")
+    count = 0
+    for batch in iter(lambda: list(itertools.islice(discussions, INSERT_BATCH_SIZE)), []):
+        cur.executemany(sql, [discussion_row(discussion) for discussion in batch])
+        index_documents(cur, [
+            ("discussions", discussion.get("number"), discussion.get("title"), discussion.get("bodyText"))
+            for discussion in batch
+        ])
+        count += len(batch)
+    return count
+
+
+def copy_discussions(conn, db_path):
+    """Carry the discussions of the database at `db_path` over into a freshly built one, so that
+    reloading issues alone does not drop them. Their search index entries come along too, since
+    the bodies are only stored there."""
+    if not os.path.exists(db_path):
+        return 0
+    conn.execute("ATTACH DATABASE ? AS previous", (db_path,))
+    try:
+        found = conn.execute(
+            "SELECT 1 FROM previous.sqlite_master WHERE type = 'table' AND name = 'discussions'"
+        ).fetchone()
+        if not found:
+            return 0
+        # A database built before a column was added lacks it: carry NULL over instead.
+        previous_columns = {row[0] for row in conn.execute("SELECT name FROM pragma_table_info('discussions', 'previous')")}
+        columns = ", ".join(DISCUSSION_COLUMNS)
+        values = ", ".join(col if col in previous_columns else "NULL" for col in DISCUSSION_COLUMNS)
+        count = conn.execute(f"INSERT INTO discussions({columns}) SELECT {values} FROM previous.discussions").rowcount
+        if conn.execute(
+            "SELECT 1 FROM previous.sqlite_master WHERE type = 'table' AND name = 'search_index'"
+        ).fetchone():
+            conn.execute("""
+                INSERT INTO search_documents(tbl, item_id)
+                SELECT tbl, item_id FROM previous.search_documents WHERE tbl = 'discussions'
+            """)
+            conn.execute("""
+                INSERT INTO search_index(rowid, title, body)
+                SELECT documents.rowid, previous_index.title, previous_index.body
+                FROM previous.search_documents previous_documents
+                JOIN previous.search_index previous_index ON previous_index.rowid = previous_documents.rowid
+                JOIN search_documents documents
+                    ON documents.tbl = previous_documents.tbl AND documents.item_id = previous_documents.item_id
+                WHERE previous_documents.tbl = 'discussions'
+            """)
+        conn.commit()  # DETACH is not allowed inside a transaction
+        return count
+    finally:
+        conn.execute("DETACH DATABASE previous")
+
+
+def load_known_versions(cur):
+    """Map the id of every issue and pull request already in the database to its `updated_at`."""
+    cur.execute("""
+        SELECT id, updated_at FROM issues
+        UNION ALL
+        SELECT id, updated_at FROM pull_requests
+    """)
+    return dict(cur.fetchall())
+
+
+def write_issues_to_sqlite(issues, output_dir, repo_owner, repo_name, incremental=False, profile="bulk",
+                           discussions=None):
+    """Load `issues` (any iterable of REST issue objects) into `<owner>_<repo>.db`, along with
+    `discussions` (archived GraphQL discussion nodes) if given. A full load without
+    `discussions` keeps the ones already in the database.
+
+    A full load builds a fresh database next to the old one and swaps it in at the end, so the
+    previous database stays queryable until then. An incremental load upserts into the existing
+    database instead, skipping items whose `updated_at` is unchanged and re-linking labels only
+    for the items that did change. Either way everything is applied in a single transaction.
+
+    `profile` selects the PRAGMAs used while loading (see LOAD_PROFILES). Secondary indexes are
+    only built once the rows are in, which is much cheaper than maintaining them row by row.
+    """
+    db_filename = f"{repo_owner}_{repo_name}.db"
+    db_path = os.path.join(output_dir, db_filename)
+
+    if incremental and not os.path.exists(db_path):
+        print(f"No database at {db_path} yet, falling back to a full load.")
+        incremental = False
+
+    if incremental:
+        build_path = db_path
+        print(f"Updating SQLite database at {db_path} incrementally...")
+    else:
+        build_path = f"{db_path}.tmp"
+        if os.path.exists(build_path):
+            os.remove(build_path)
+        print(f"Setting up SQLite database at {build_path}...")
+
+    conn = sqlite3.connect(build_path)
+    cur = conn.cursor()
+    apply_load_profile(conn, profile, incremental)
+
+    try:
+        load_started = time.perf_counter()
+        reindex = incremental and not cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+        ).fetchone()
+        if reindex:
+            # Bodies were never stored, so unchanged items must be read from the archive again.
+            print("Database has no search index yet, reloading every item to build it...")
+        create_tables(cur)
+        ensure_columns(cur)
+        if not incremental and discussions is None:
+            carried = copy_discussions(conn, db_path)
+            if carried:
+                print(f"Kept {carried} discussions from the previous database.")
+        known_versions = load_known_versions(cur) if incremental and not reindex else {}
+
+        issue_rows = []
+        pr_rows = []
+        label_map = {}
+        issue_label_rows = []
+        search_rows = []
+        issue_count = 0
+        pr_count = 0
+        skipped_count = 0
+        issue_label_count = 0
+        affected_months = {}
+
+        # Rows are flushed in batches so that memory stays flat while streaming the archive.
+        def flush():
+            nonlocal issue_count, pr_count, issue_label_count
+            if incremental:
+                changed_ids = [(row[0],) for row in issue_rows + pr_rows]
+                cur.executemany("DELETE FROM issue_labels WHERE issue_id = ?", changed_ids)
+                for table, rows in (("issues", issue_rows), ("pull_requests", pr_rows)):
+                    affected_months.setdefault(table, set()).update(row[4][:7] for row in rows if row[4])
+            if issue_rows:
+                cur.executemany(upsert_sql("issues", ISSUE_COLUMNS), issue_rows)
+            if pr_rows:
+                cur.executemany(upsert_sql("pull_requests", PR_COLUMNS), pr_rows)
+            if issue_label_rows:
+                cur.executemany("""
+                    INSERT OR IGNORE INTO issue_labels(issue_id, label_id)
+                    VALUES (?, ?)
+                """, issue_label_rows)
+                issue_label_count += cur.rowcount
+            index_documents(cur, search_rows)
+            issue_count += len(issue_rows)
+            pr_count += len(pr_rows)
+            issue_rows.clear()
+            pr_rows.clear()
+            issue_label_rows.clear()
+            search_rows.clear()
+
+        print("Upserting issues and pull requests into database...")
+        for issue in issues:
+            issue_id = issue.get("id")
+            number = issue.get("number")
+            title = issue.get("title")
+            state = issue.get("state")
+            created_at = issue.get("created_at")
+            updated_at = issue.get("updated_at")
+            closed_at = issue.get("closed_at")
+            user_login = issue.get("user", {}).get("login") if issue.get("user") else None
+
+            if incremental and issue_id in known_versions and known_versions[issue_id] == updated_at:
+                skipped_count += 1
+                continue
+
+            row = (issue_id, number, title, state, created_at, updated_at, closed_at, user_login)
+
+            # GitHub API is funny, it returns issues and pull requests in the same endpoint.
+            if "pull_request" in issue:
+                is_draft = issue.get("draft", False)
+                pr_row = row + (is_draft, head_ref(issue, repo_owner, repo_name))
+                pr_rows.append(pr_row)
+                search_rows.append(("pull_requests", issue_id, title, issue.get("body")))
+            else:
+                issue_rows.append(row)
+                search_rows.append(("issues", issue_id, title, issue.get("body")))
+
+            labels = issue.get("labels", [])
+            for label in labels:
+                lbl_id = label.get("id")
+                name = label.get("name")
+                color = label.get("color")
+                desc = label.get("description")
+                if lbl_id is not None:
+                    # Later (fresher) occurrences win, so renamed labels are picked up.
+                    label_map[lbl_id] = (lbl_id, name, color, desc)
+                    issue_label_rows.append((issue_id, lbl_id))
+
+            if len(issue_rows) + len(pr_rows) >= INSERT_BATCH_SIZE:
+                flush()
+        flush()
+        print(f"Upserted {issue_count} issues into the database.")
+        print(f"Upserted {pr_count} pull requests into the database.")
+        if incremental:
+            print(f"Skipped {skipped_count} unchanged issues and pull requests.")
+        print(f"Inserted {issue_label_count} issue-label records into the database.")
+
+        print("Upserting labels into database...")
+        label_rows = list(label_map.values())
+        if label_rows:
+            cur.executemany(upsert_sql("labels", LABEL_COLUMNS), label_rows)
+        print(f"Upserted {len(label_rows)} labels into the database.")
+
+        if discussions is not None:
+            print("Upserting discussions into database...")
+            print(f"Upserted {load_discussions(cur, iter(discussions))} discussions into the database.")
+
+        print("Refreshing monthly rollups...")
+        refresh_rollups(cur, affected_months if incremental else None)
+        refresh_discussion_rollup(cur)
+
+        conn.commit()
+        load_seconds = time.perf_counter() - load_started
+
+        index_started = time.perf_counter()
+        create_indexes(cur, incremental)
+        conn.commit()
+        index_seconds = time.perf_counter() - index_started
+    except Exception:
+        conn.rollback()
+        conn.close()
+        if not incremental:
+            os.remove(build_path)
+        raise
+
+    # Leave a self-contained database file behind (no -wal/-shm side files).
+    conn.execute("PRAGMA journal_mode = DELETE")
     conn.close()
+    if not incremental:
+        os.replace(build_path, db_path)
+    print(f"Load took {load_seconds:.3f}s, index build and ANALYZE took {index_seconds:.3f}s.")
     print(f"Database population complete. SQLite DB saved at {db_path}.")
 
     return db_path
 
 
-def read_json_file(filepath):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
-    except FileNotFoundError:
+def read_archive(filepath):
+    """Return a generator over the items of an issues or discussions archive (NDJSON, compressed NDJSON or
+    a legacy JSON array), or None if the archive is missing or empty."""
+    if not os.path.exists(filepath):
         print(f"Error: File not found - {filepath}")
-    except json.JSONDecodeError as e:
-        print(f"Error: Failed to decode JSON - {e}")
-    except Exception as e:
-        print(f"Unexpected error: {e}")
+        return None
 
-    return None
+    items = iter_archive(filepath)
+    try:
+        first = next(items, None)
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Error: Failed to decode JSON - {e}")
+        return None
+    if first is None:
+        return None
+    return itertools.chain([first], items)
 
 
-# Regenerate the database if it already exists.
+# Regenerate the database if it already exists, unless --incremental is given.
 def main():
     setup_logger()
 
     parser = argparse.ArgumentParser(description="Load GitHub issues from a JSON archive into SQLite.")
-    parser.add_argument("--input", dest="input", required=True, help="Path to the GitHub issues JSON archive")
+    parser.add_argument("--input", dest="input", required=True,
+                        help="Path to the GitHub issues archive (.ndjson, .ndjson.gz, .ndjson.zst or legacy .json)")
+    parser.add_argument(
+        "--discussions",
+        help="Path to a discussions archive to load as well. Without it, a full load keeps the discussions "
+             "already in the database.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert changed items into the existing database instead of rebuilding it.",
+    )
+    parser.add_argument(
+        "--load-profile",
+        choices=sorted(LOAD_PROFILES),
+        default="bulk",
+        help="PRAGMA profile used while loading (bulk: WAL, relaxed fsync, large page cache).",
+    )
     parser.add_argument(
         "--env-file",
         type=str,
@@ -179,17 +618,31 @@ def main():
         print(f"Error loading environment variables: {e}")
         return 1
 
-    issues = read_json_file(args.input)
+    issues = read_archive(args.input)
     if not issues:
         print("No data found. Exiting.")
         return 1
 
-    write_issues_to_sqlite(
-        issues=issues,
-        output_dir=OUTPUT_DIR,
-        repo_owner=env['REPO_OWNER'],
-        repo_name=env['REPO_NAME'],
-    )
+    discussions = None
+    if args.discussions:
+        discussions = read_archive(args.discussions)
+        if discussions is None:
+            print("No discussions found. Exiting.")
+            return 1
+
+    try:
+        write_issues_to_sqlite(
+            issues=issues,
+            output_dir=OUTPUT_DIR,
+            repo_owner=env['REPO_OWNER'],
+            repo_name=env['REPO_NAME'],
+            incremental=args.incremental,
+            profile=args.load_profile,
+            discussions=discussions,
+        )
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Error: Failed to decode JSON - {e}")
+        return 1
 
 
 if __name__ == "__main__":
@@ -1,90 +1,207 @@
-import subprocess
-import os
 from datetime import datetime, timedelta
 import argparse
-import json
+import os
+import sqlite3
+
+from scripts.db import sqlite_writer
+from scripts.util.bulk_actions import DEFAULT_WORKERS, MUTATION_INTERVAL, run_bulk
+from scripts.util.github_client import API_URL, get_client
+from scripts.util.load_env import ENV_FILE, load_github_env_vars
 
-# GitHub repository details
-REPO_OWNER = "vectordotdev"
-REPO_NAME = "vector"
+SEARCH_URL = f"{API_URL}/search/issues"
+PAGE_SIZE = 100  # Search API maximum
+PULL_REQUESTS_PER_QUERY = 100  # Aliased lookups per GraphQL freshness check
+STALE_LABEL = "meta: awaiting author"
 
 # Define the cutoff date (6 months ago)
 CUTOFF_DATE = datetime.now() - timedelta(days=6 * 30)  # Approximation for 6 months
 
-# Fetch pull requests using gh CLI
-def fetch_pull_requests():
-    try:
-        result = subprocess.run(
-            ["gh", "pr", "list", "--repo", f"{REPO_OWNER}/{REPO_NAME}", "--state", "open", "--json", "number,title,createdAt,labels"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(f"Error fetching pull requests: {e.stderr}")
-        raise
+COMMENT = (
+    "Thank you for your contribution to Vector! To keep the repository tidy and focused, we are closing this PR due to inactivity. "
+    "We greatly appreciate the time and effort you've put into this PR. "
+    "If you'd like to continue working on it, we encourage you to re-open the PR and we would be delighted to review it again. "
+    "Before re-opening, please git merge origin master to resolve any conflicts with origin/master."
+)
+
+
+# Fetch the stale pull requests, filtered server-side by the search API
+def fetch_pull_requests(client, repo_owner, repo_name, cutoff_date=CUTOFF_DATE):
+    """Return every open pull request labelled STALE_LABEL and created before `cutoff_date`,
+    following the search API's pagination."""
+    query = (f'repo:{repo_owner}/{repo_name} is:pr is:open label:"{STALE_LABEL}" '
+             f'created:<{cutoff_date.strftime("%Y-%m-%d")}')
+    url = SEARCH_URL
+    params = {"q": query, "per_page": PAGE_SIZE, "sort": "created", "order": "asc"}
+    pull_requests = []
+    while url:
+        response = client.get(url, params=params)
+        if response.status_code != 200:
+            raise RuntimeError(f"Error fetching pull requests: {response.status_code} - {response.text}")
+        result = response.json()
+        if result.get("incomplete_results"):
+            print("Warning: the search timed out on GitHub's side and may be missing pull requests.")
+        pull_requests.extend(result["items"])
+        # The `next` link already carries the query parameters.
+        url, params = response.links.get("next", {}).get("url"), None
+    return pull_requests
 
-# Add a comment to a pull request using gh CLI
-def add_comment_to_pr(pr_number, comment):
-    try:
-        subprocess.run(
-            ["gh", "pr", "comment", str(pr_number), "--repo", f"{REPO_OWNER}/{REPO_NAME}", "--body", comment],
-            check=True
-        )
-        print(f"Added comment to PR #{pr_number}")
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to add comment to PR #{pr_number}: {e.stderr}")
-        raise
 
-# Close a pull request using gh CLI
-def close_pull_request(pr_number):
+# Read the stale pull requests from the local SQLite mirror instead, without any API calls
+def fetch_pull_requests_from_db(db_path, cutoff_date=CUTOFF_DATE):
+    """Return the open pull requests labelled STALE_LABEL and created before `cutoff_date`
+    according to the database at `db_path`, in the shape of search results."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
     try:
-        subprocess.run(
-            ["gh", "pr", "close", str(pr_number), "--repo", f"{REPO_OWNER}/{REPO_NAME}"],
-            check=True
+        rows = conn.execute("""
+            SELECT pull_requests.number, pull_requests.title, pull_requests.created_at
+            FROM pull_requests
+            JOIN issue_labels ON issue_labels.issue_id = pull_requests.id
+            JOIN labels ON labels.id = issue_labels.label_id
+            WHERE pull_requests.state = 'open' AND labels.name = ? AND pull_requests.created_at < ?
+            ORDER BY pull_requests.created_at
+        """, (STALE_LABEL, cutoff_date.strftime("%Y-%m-%dT%H:%M:%SZ"))).fetchall()
+    finally:
+        conn.close()
+    return [{"number": number, "title": title, "created_at": created_at} for number, title, created_at in rows]
+
+
+# Confirm that candidates from the database are still open and labelled
+def check_pull_requests(client, repo_owner, repo_name, pull_requests):
+    """Return the `pull_requests` that are still open and labelled STALE_LABEL, looking up just
+    those, PULL_REQUESTS_PER_QUERY per aliased GraphQL query."""
+    fresh = []
+    for start in range(0, len(pull_requests), PULL_REQUESTS_PER_QUERY):
+        batch = pull_requests[start:start + PULL_REQUESTS_PER_QUERY]
+        aliases = "".join(
+            f"pr{pr['number']}: pullRequest(number: {int(pr['number'])}) "
+            "{ number title createdAt state labels(first: 100) { nodes { name } } }\n"
+            for pr in batch
         )
-        print(f"Closed PR #{pr_number}")
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to close PR #{pr_number}: {e.stderr}")
-        raise
+        query = f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{\n{aliases}}} }}"
+        response = client.graphql(query, {"owner": repo_owner, "name": repo_name})
+        # A pull request that no longer exists comes back as null next to a NOT_FOUND error.
+        data = (response.json().get("data") or {}) if response.status_code == 200 else {}
+        if not data.get("repository"):
+            raise RuntimeError(f"Error checking pull requests: {response.status_code} - {response.text}")
+        for node in data["repository"].values():
+            if node is None:
+                continue
+            labels = {label["name"] for label in node["labels"]["nodes"]}
+            if node["state"] == "OPEN" and STALE_LABEL in labels:
+                fresh.append({"number": node["number"], "title": node["title"], "created_at": node["createdAt"]})
+            else:
+                print(f"PR #{node['number']} is no longer open and labelled '{STALE_LABEL}', skipping.")
+    return fresh
+
+
+# Add a comment to a pull request
+def add_comment_to_pr(client, repo_owner, repo_name, pr_number, comment):
+    # Never resent after a 5xx or a dropped connection: GitHub may already have posted it, and a
+    # second closing comment would land on the contributor's PR. Such a PR is reported as failed.
+    response = client.post(f"{API_URL}/repos/{repo_owner}/{repo_name}/issues/{pr_number}/comments",
+                           json={"body": comment}, idempotent=False)
+    if response.status_code != 201:
+        return False, f"failed to add comment: {response.status_code} - {response.text}"
+    return True, "added comment"
+
+
+# Close a pull request
+def close_pull_request(client, repo_owner, repo_name, pr_number):
+    # Closing an already closed PR changes nothing, so this one may be resent.
+    response = client.patch(f"{API_URL}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}",
+                            json={"state": "closed"}, idempotent=True)
+    if response.status_code != 200:
+        return False, f"failed to close: {response.status_code} - {response.text}"
+    return True, "closed"
+
+
+def describe(pr_number):
+    return f"PR #{pr_number}"
+
 
 # Main function
-def main(dry_run):
-    print("Fetching pull requests...")
-    pull_requests = fetch_pull_requests()
+def main(dry_run, env_file=ENV_FILE, workers=DEFAULT_WORKERS, min_interval=MUTATION_INTERVAL, from_db=False,
+         db_path=None, check=False):
+    env = load_github_env_vars(env_file)
+    repo_owner, repo_name = env["REPO_OWNER"], env["REPO_NAME"]
+    client = get_client(env["GITHUB_TOKEN"])
 
-    closed_prs = []
+    if from_db:
+        db_path = db_path or os.path.join(sqlite_writer.OUTPUT_DIR, f"{repo_owner}_{repo_name}.db")
+        if not os.path.exists(db_path):
+            print(f"Error: No database at {db_path}")
+            return 1
+        print(f"Reading pull requests from {db_path}...")
+        pull_requests = fetch_pull_requests_from_db(db_path)
+        # The database may be any age: only a dry run may act on it without confirming the
+        # candidates are still open and labelled.
+        if (check or not dry_run) and pull_requests:
+            print(f"Checking {len(pull_requests)} candidates against the API...")
+            pull_requests = check_pull_requests(client, repo_owner, repo_name, pull_requests)
+    else:
+        print("Fetching pull requests...")
+        pull_requests = fetch_pull_requests(client, repo_owner, repo_name)
 
+    stale_prs = []
     for pr in pull_requests:
-        pr_number = pr["number"]
-        pr_title = pr["title"]
-        created_at = datetime.strptime(pr["createdAt"], "%Y-%m-%dT%H:%M:%SZ")
-
-        if created_at < CUTOFF_DATE:
-            labels = [label["name"] for label in pr["labels"]]
-
-            if "meta: awaiting author" in labels:
-                print(f"PR #{pr_number} (created at: {created_at}) would be closed.")
-                if not dry_run:
-                    comment = (
-                        "Thank you for your contribution to Vector! To keep the repository tidy and focused, we are closing this PR due to inactivity. "
-                        "We greatly appreciate the time and effort you've put into this PR. "
-                        "If you'd like to continue working on it, we encourage you to re-open the PR and we would be delighted to review it again. "
-                        "Before re-opening, please git merge origin master to resolve any conflicts with origin/master."
-                    )
-                    add_comment_to_pr(pr_number, comment)
-                    close_pull_request(pr_number)
-                closed_prs.append({"number": pr_number, "title": pr_title, "created_at": created_at})
+        created_at = datetime.strptime(pr["created_at"], "%Y-%m-%dT%H:%M:%SZ")
+        print(f"PR #{pr['number']} (created at: {created_at}) would be closed.")
+        stale_prs.append({"number": pr["number"], "title": pr["title"], "created_at": created_at})
 
+    failed = {}
+    if not dry_run and stale_prs:
+        # Comment on every PR first, and only close the ones whose comment went through.
+        commented = run_bulk(
+            [pr["number"] for pr in stale_prs],
+            lambda number: add_comment_to_pr(client, repo_owner, repo_name, number, COMMENT),
+            workers=workers, min_interval=min_interval, describe=describe,
+        )
+        failed.update({outcome["item"]: outcome["detail"] for outcome in commented if not outcome["succeeded"]})
+        closed = run_bulk(
+            [outcome["item"] for outcome in commented if outcome["succeeded"]],
+            lambda number: close_pull_request(client, repo_owner, repo_name, number),
+            workers=workers, min_interval=min_interval, describe=describe,
+        )
+        failed.update({outcome["item"]: outcome["detail"] for outcome in closed if not outcome["succeeded"]})
+
+    closed_prs = [pr for pr in stale_prs if pr["number"] not in failed]
     print("\nReport:")
     print(f"Total PRs that would be closed: {len(closed_prs)}" if dry_run else f"Total PRs closed: {len(closed_prs)}")
     for pr in closed_prs:
         print(f"- PR #{pr['number']}: {pr['title']} (Created at: {pr['created_at']})")
+    if failed:
+        print(f"Total PRs that could not be closed: {len(failed)}")
+        for pr in stale_prs:
+            if pr["number"] in failed:
+                print(f"- PR #{pr['number']}: {pr['title']} ({failed[pr['number']]})")
+    return 1 if failed else 0
 
 if __name__ == "__main__":
+    import sys
+
     parser = argparse.ArgumentParser(description="Close inactive GitHub pull requests.")
     parser.add_argument("--dry-run", action="store_true", help="If set, do not modify any PRs, only print what would be done.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent comment and close requests.")
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=MUTATION_INTERVAL,
+        help="Minimum seconds between comment and close requests, to stay clear of secondary rate limits.",
+    )
+    parser.add_argument(
+        "--from-db",
+        action="store_true",
+        help="Read the candidates from the local SQLite database instead of the search API.",
+    )
+    parser.add_argument("--db", help="Path of the SQLite database used with --from-db (default: out/db/<owner>_<repo>.db).")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="With --from-db and --dry-run, still confirm that just the candidates are open and labelled "
+             "(always done when PRs are actually closed).",
+    )
+    parser.add_argument("--env-file", type=str, default=ENV_FILE, help="Path to the .env file to load environment variables from")
     args = parser.parse_args()
 
-    main(dry_run=args.dry_run)
+    sys.exit(main(dry_run=args.dry_run, env_file=args.env_file, workers=args.workers, min_interval=args.min_interval,
+                  from_db=args.from_db, db_path=args.db, check=args.check))
@@ -1,9 +1,15 @@
+import argparse
 import os
+import sqlite3
 from datetime import datetime, timedelta, UTC
+from urllib.parse import quote
 import requests
 import json
 import semver  # Added semver library
 
+from scripts.db import sqlite_writer
+from scripts.util.bulk_actions import DEFAULT_WORKERS, MUTATION_INTERVAL, run_bulk
+from scripts.util.github_client import API_URL as GITHUB_API_URL, get_client
 from scripts.util.load_env import load_github_env_vars
 
 # Load environment variables
@@ -12,14 +18,42 @@ OWNER = ENV.get("REPO_OWNER", "vectordotdev")
 REPO = ENV.get("REPO_NAME", "vector")
 TOKEN = ENV.get("GITHUB_TOKEN")
 
-# GitHub API URL for branches
-API_URL = f"https://api.github.com/repos/{OWNER}/{REPO}/branches"
+# Shared pooled client; authentication headers are set on its session
+CLIENT = get_client(TOKEN)
 
-# Set the headers for authentication
-COMMON_HEADERS = {
-    "Authorization": f"token {TOKEN}",
-    "Accept": "application/vnd.github.v3+json"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../out/maintenance"))
+PLAN_FILE = os.path.join(OUTPUT_DIR, f"{OWNER}_{REPO}_stale_branches.json")
+DB_PATH = os.path.join(sqlite_writer.OUTPUT_DIR, f"{OWNER}_{REPO}.db")
+
+# The protection and last commit date of a branch
+REF_FIELDS = """
+      name
+      branchProtectionRule {
+        id
+      }
+      target {
+        ... on Commit {
+          committedDate
+        }
+      }
+"""
+REFS_PER_QUERY = 100
+
+# Every branch with its protection and last commit date, 100 refs per request
+REFS_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    refs(refPrefix: "refs/heads/", first: $first, after: $after) {
+      pageInfo {
+        endCursor
+        hasNextPage
+      }
+      nodes {%s}
+    }
+  }
 }
+""" % REF_FIELDS
 
 
 def is_semver_branch(branch_name):
@@ -34,21 +68,24 @@ def is_semver_branch(branch_name):
         return False
 
 
+def parse_date(timestamp):
+    """Parse a GitHub ISO 8601 UTC timestamp into an aware datetime."""
+    return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=UTC)
+
+
 def get_last_commit_date(github_token, repo_owner, repo_name, branch_name):
     """Fetch the last commit date for the given branch from GitHub API"""
-    url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/commits?sha={branch_name}&per_page=1"
-    headers = {"Authorization": f"token {github_token}", "Accept": "application/vnd.github.v3+json"}
+    url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/commits"
 
     try:
-        response = requests.get(url, headers=headers)
+        response = get_client(github_token).get(url, params={"sha": branch_name, "per_page": 1})
         response.raise_for_status()
 
         commits = response.json()
         if not commits:
             return None
 
-        last_commit_date = commits[0]['commit']['committer']['date']
-        return datetime.strptime(last_commit_date, "%Y-%m-%dT%H:%M:%SZ")
+        return parse_date(commits[0]['commit']['committer']['date'])
 
     except requests.exceptions.RequestException as e:
         print(f"Error fetching commit date for branch {branch_name}: {str(e)}")
@@ -65,80 +102,354 @@ def check_branch_activity(last_commit_date, activity_limit_years=4):
     return (now - last_commit_date) <= activity_limit
 
 
-def get_branches(page=1, per_page=100):
-    """Fetches a list of all branches from the repository with pagination."""
-    params = {"page": page, "per_page": per_page}
-    try:
-        response = requests.get(API_URL, headers=COMMON_HEADERS, params=params)
-        response.raise_for_status()
+def get_protected_branch_names(per_page=100):
+    """Return the names of the branches the REST API reports as protected, or None on failure.
 
-        branches = response.json()
-        link_header = response.headers.get("Link", "")
-        has_next = "rel=\"next\"" in link_header
-        return branches, has_next
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching branches (page {page}): {str(e)}")
-        return [], False
+    This covers branches guarded by rulesets as well as by classic branch protection rules,
+    whereas GraphQL's `branchProtectionRule` only reports the latter.
+    """
+    url = f"{GITHUB_API_URL}/repos/{OWNER}/{REPO}/branches"
+    params = {"protected": "true", "per_page": per_page}
+    names = set()
+    while url:
+        try:
+            response = CLIENT.get(url, params=params)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching protected branches: {str(e)}")
+            return None
+        names.update(branch["name"] for branch in response.json())
+        # The `next` link already carries the query parameters.
+        url, params = response.links.get("next", {}).get("url"), None
+    return names
+
+
+def get_branches(per_page=100):
+    """Fetch every branch with its protection status and last commit date through GraphQL.
+
+    Returns a list of {"name", "protected", "last_commit_date"} dicts, or None if a page failed.
+    One request covers `per_page` branches, instead of a branch listing plus one commits
+    request per branch; protection also takes the REST listing of protected branches into account.
+    """
+    protected_names = get_protected_branch_names()
+    if protected_names is None:
+        return None
+
+    branches = []
+    variables = {"owner": OWNER, "name": REPO, "first": per_page, "after": None}
+    while True:
+        try:
+            response = CLIENT.graphql(REFS_QUERY, variables)
+            response.raise_for_status()
+            result = response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching branches: {str(e)}")
+            return None
+        if "errors" in result:
+            print(f"Error fetching branches: {result['errors']}")
+            return None
+
+        refs = result["data"]["repository"]["refs"]
+        branches.extend(to_branch(ref, protected_names) for ref in refs["nodes"])
+        print(f"Fetched {len(branches)} branches so far...")
+
+        if not refs["pageInfo"]["hasNextPage"]:
+            return branches
+        variables["after"] = refs["pageInfo"]["endCursor"]
+
+
+def to_branch(ref, protected_names):
+    committed_date = (ref.get("target") or {}).get("committedDate")
+    return {
+        "name": ref["name"],
+        "protected": ref.get("branchProtectionRule") is not None or ref["name"] in protected_names,
+        "last_commit_date": parse_date(committed_date) if committed_date else None,
+    }
+
+
+def get_refs(names):
+    """Look up just the given branches, REFS_PER_QUERY per aliased GraphQL query.
+
+    Returns the branches that still exist in the same shape as `get_branches`, or None if a
+    query failed.
+    """
+    protected_names = get_protected_branch_names()
+    if protected_names is None:
+        return None
+
+    branches = []
+    for start in range(0, len(names), REFS_PER_QUERY):
+        batch = names[start:start + REFS_PER_QUERY]
+        aliases = "".join(
+            f"b{i}: ref(qualifiedName: {json.dumps('refs/heads/' + name)}) {{{REF_FIELDS}}}\n"
+            for i, name in enumerate(batch)
+        )
+        query = f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{\n{aliases}}} }}"
+        try:
+            response = CLIENT.graphql(query, {"owner": OWNER, "name": REPO})
+            response.raise_for_status()
+            result = response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching branches: {str(e)}")
+            return None
+        if "errors" in result:
+            print(f"Error fetching branches: {result['errors']}")
+            return None
+        branches.extend(to_branch(ref, protected_names) for ref in result["data"]["repository"].values() if ref)
+    return branches
+
+
+def branch_candidates_from_db(db_path, activity_limit_years=4):
+    """Return the head branches of this repository's pull requests that are all closed and were
+    last updated before the activity limit, from the local SQLite mirror. Costs no API calls.
+
+    Returns (name, last pull request update) pairs, or None if the database has no head branches
+    (only issue archives fetched with `--api graphql` record them).
+    """
+    if not os.path.exists(db_path):
+        print(f"Error: No database at {db_path}")
+        return None
+    cutoff = format_date(datetime.now(UTC) - timedelta(days=activity_limit_years * 365))
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        columns = {row[0] for row in conn.execute("SELECT name FROM pragma_table_info('pull_requests')")}
+        if ("head_ref" not in columns or
+                not conn.execute("SELECT 1 FROM pull_requests WHERE head_ref IS NOT NULL LIMIT 1").fetchone()):
+            print(f"Error: {db_path} records no pull request head branches; load an archive fetched with --api graphql.")
+            return None
+        return conn.execute("""
+            SELECT head_ref, MAX(updated_at)
+            FROM pull_requests
+            WHERE head_ref IS NOT NULL
+            GROUP BY head_ref
+            HAVING SUM(state = 'open') = 0 AND MAX(updated_at) < ?
+            ORDER BY head_ref
+        """, (cutoff,)).fetchall()
+    except sqlite3.OperationalError as e:
+        print(f"Error reading {db_path}: {e}")
+        return None
+    finally:
+        conn.close()
 
 
 def delete_branch(branch_name):
-    """Deletes the specified branch using the GitHub API."""
-    delete_url = f"https://api.github.com/repos/{OWNER}/{REPO}/git/refs/heads/{branch_name}"
+    """Delete the specified branch using the GitHub API. Returns (succeeded, detail)."""
+    delete_url = f"{GITHUB_API_URL}/repos/{OWNER}/{REPO}/git/refs/heads/{quote(branch_name, safe='/')}"
     try:
-        response = requests.delete(delete_url, headers=COMMON_HEADERS)
+        response = CLIENT.delete(delete_url)
         if response.status_code == 204:
-            print(f"Successfully deleted branch: {branch_name}")
-        else:
-            print(f"Failed to delete branch {branch_name}: {response.status_code} - {response.text}")
+            return True, "deleted"
+        return False, f"{response.status_code} - {response.text}"
     except requests.exceptions.RequestException as e:
-        print(f"Error deleting branch {branch_name}: {str(e)}")
+        return False, str(e)
 
 
-def main():
-    """Main function to list and delete stale branches with pagination."""
-    if not all([OWNER, REPO, TOKEN]):
-        print("Error: Missing required environment variables (REPO_OWNER, REPO_NAME, GITHUB_TOKEN)")
-        return
+def format_date(date):
+    return date.strftime("%Y-%m-%dT%H:%M:%SZ") if date else None
 
-    page = 1
-    per_page = 100
-    all_branches = []
 
-    while True:
-        branches, has_next = get_branches(page, per_page)
-        if not branches:
-            break
-        all_branches.extend(branches)
-        if not has_next:
-            break
-        page += 1
-
-    if not all_branches:
-        print("No branches found or failed to fetch branches.")
-        return
-
-    for branch in all_branches:
+def is_special_branch(branch):
+    """Protected branches, main/master, and valid SemVer branches are never deleted."""
+    return (branch.get('protected', False) or
+            branch['name'] in ['main', 'master'] or
+            is_semver_branch(branch['name']))
+
+
+def find_stale_branches(branches, activity_limit_years=4):
+    """Return the plan entries of the `branches` that have had no commits within the limit."""
+    stale = []
+    for branch in branches:
         branch_name = branch['name']
 
-        # Skip protected branches, main/master, and valid SemVer branches
-        if (branch.get('protected', False) or
-                branch_name in ['main', 'master'] or
-                is_semver_branch(branch_name)):
+        if is_special_branch(branch):
             print(f"Skipping special branch: {branch_name}")
             continue
 
         # Check branch activity
-        last_commit_date = get_last_commit_date(TOKEN, OWNER, REPO, branch_name)
+        last_commit_date = branch['last_commit_date']
+        if last_commit_date is None:
+            # Only refs that do not point at a commit need the per-branch lookup.
+            last_commit_date = get_last_commit_date(TOKEN, OWNER, REPO, branch_name)
 
         if last_commit_date:
-            if check_branch_activity(last_commit_date):
+            if check_branch_activity(last_commit_date, activity_limit_years):
                 print(f"Keeping active branch: {branch_name} (Last commit: {last_commit_date})")
             else:
-                print(f"Deleting stale branch: {branch_name} (Last commit: {last_commit_date})")
-                delete_branch(branch_name)
+                print(f"Planning to delete stale branch: {branch_name} (Last commit: {last_commit_date})")
+                stale.append({"name": branch_name, "last_commit_date": format_date(last_commit_date)})
         else:
             print(f"Could not determine activity for branch: {branch_name}")
+    return stale
+
+
+def plan(plan_file, activity_limit_years=4, db_path=None, check=False):
+    """Compute the stale branches and write them to `plan_file` for review. Deletes nothing.
+
+    With `db_path`, the candidates are the head branches of long-closed pull requests in the
+    local database instead of a listing of every branch. Their commit dates are then unknown
+    (so `execute` checks activity itself), unless `check` looks just those branches up.
+    """
+    if db_path:
+        candidates = branch_candidates_from_db(db_path, activity_limit_years)
+        if candidates is None:
+            return False
+        considered = len(candidates)
+        if check:
+            branches = get_refs([name for name, _ in candidates])
+            if branches is None:
+                return False
+            print(f"{considered - len(branches)} of {considered} candidate branches no longer exist.")
+            stale = find_stale_branches(branches, activity_limit_years)
+        else:
+            stale = []
+            for name, last_update in candidates:
+                if is_special_branch({"name": name}):
+                    print(f"Skipping special branch: {name}")
+                    continue
+                print(f"Planning to delete stale branch: {name} (Last pull request update: {last_update})")
+                stale.append({"name": name, "last_commit_date": None, "last_pull_request_update": last_update})
+    else:
+        all_branches = get_branches()
+        if not all_branches:
+            print("No branches found or failed to fetch branches.")
+            return False
+        considered = len(all_branches)
+        stale = find_stale_branches(all_branches, activity_limit_years)
+
+    os.makedirs(os.path.dirname(plan_file), exist_ok=True)
+    with open(plan_file, "w") as f:
+        json.dump({
+            "repository": f"{OWNER}/{REPO}",
+            "generated_at": format_date(datetime.now(UTC)),
+            "activity_limit_years": activity_limit_years,
+            "branches": stale,
+        }, f, indent=4)
+    print(f"Planned {len(stale)} of {considered} branches for deletion in {plan_file}")
+    print("Review the plan, then delete the branches with: execute --plan-file <plan>")
+    return True
+
+
+def results_path(plan_file):
+    return os.path.splitext(plan_file)[0] + "_results.json"
+
+
+def execute(plan_file, workers=DEFAULT_WORKERS, min_interval=MUTATION_INTERVAL):
+    """Delete the branches listed in `plan_file` concurrently and record each outcome.
+
+    Branches are checked against a fresh listing first: any that are gone, now protected, special
+    (see `is_special_branch`, in case the plan was edited by hand) or have received commits since
+    the plan was written are skipped rather than deleted. Branches
+    planned without a commit date are skipped if they are active.
+    """
+    with open(plan_file, "r") as f:
+        planned = json.load(f)
+    if planned.get("repository") != f"{OWNER}/{REPO}":
+        print(f"Error: {plan_file} was planned for {planned.get('repository')}, not {OWNER}/{REPO}")
+        return False
+
+    current = get_branches()
+    if current is None:
+        print("Failed to fetch branches; nothing was deleted.")
+        return False
+    current = {branch["name"]: branch for branch in current}
+
+    outcomes = []
+    to_delete = []
+    for branch in planned["branches"]:
+        name = branch["name"]
+        now = current.get(name)
+        if now is None:
+            reason = "no longer exists"
+        elif now["protected"]:
+            reason = "now protected"
+        elif is_special_branch(now):
+            reason = "special branch (main/master or SemVer)"
+        elif branch["last_commit_date"] is None:
+            if check_branch_activity(now["last_commit_date"], planned["activity_limit_years"]):
+                reason = f"active (last commit: {format_date(now['last_commit_date'])})"
+            elif now["last_commit_date"] is None:
+                reason = "could not determine activity"
+            else:
+                to_delete.append(name)
+                continue
+        elif now["last_commit_date"] and format_date(now["last_commit_date"]) != branch["last_commit_date"]:
+            reason = f"updated since the plan (last commit: {format_date(now['last_commit_date'])})"
+        else:
+            to_delete.append(name)
+            continue
+        print(f"Skipping branch {name}: {reason}")
+        outcomes.append({"name": name, "status": "skipped", "detail": reason})
+
+    print(f"Deleting {len(to_delete)} branches with {workers} workers...")
+    for outcome in run_bulk(to_delete, delete_branch, workers=workers, min_interval=min_interval,
+                            describe=lambda name: f"Branch {name}"):
+        outcomes.append({
+            "name": outcome["item"],
+            "status": "deleted" if outcome["succeeded"] else "failed",
+            "detail": outcome["detail"],
+        })
+
+    counts = {status: sum(outcome["status"] == status for outcome in outcomes)
+              for status in ("deleted", "failed", "skipped")}
+    with open(results_path(plan_file), "w") as f:
+        json.dump({"repository": f"{OWNER}/{REPO}", "plan": plan_file, "counts": counts,
+                   "branches": sorted(outcomes, key=lambda outcome: outcome["name"])}, f, indent=4)
+    print(f"Deleted {counts['deleted']}, failed {counts['failed']}, skipped {counts['skipped']}; "
+          f"outcomes written to {results_path(plan_file)}")
+    return counts["failed"] == 0
+
+
+def main():
+    """Plan the deletion of stale branches, or execute a reviewed plan."""
+    parser = argparse.ArgumentParser(description="Delete stale branches in two reviewable steps.")
+    parser.add_argument(
+        "mode",
+        nargs="?",
+        choices=["plan", "execute"],
+        default="plan",
+        help="'plan' writes the stale branches to the plan file without deleting anything; "
+             "'execute' deletes the branches listed in it.",
+    )
+    parser.add_argument("--plan-file", default=PLAN_FILE, help="Path of the plan file to write or execute.")
+    parser.add_argument(
+        "--activity-limit-years",
+        type=int,
+        default=4,
+        help="Branches without commits for this many years are planned for deletion.",
+    )
+    parser.add_argument(
+        "--from-db",
+        action="store_true",
+        help="Plan from the head branches of long-closed pull requests in the local SQLite database "
+             "instead of listing every branch through the API.",
+    )
+    parser.add_argument("--db", default=DB_PATH, help="Path of the SQLite database used with --from-db.")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="With --from-db, look up the commit dates of just the candidate branches while planning.",
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent DELETE requests.")
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=MUTATION_INTERVAL,
+        help="Minimum seconds between DELETE requests, to stay clear of secondary rate limits.",
+    )
+    args = parser.parse_args()
+
+    if not all([OWNER, REPO, TOKEN]):
+        print("Error: Missing required environment variables (REPO_OWNER, REPO_NAME, GITHUB_TOKEN)")
+        return 1
+
+    if args.mode == "plan":
+        succeeded = plan(args.plan_file, args.activity_limit_years, args.db if args.from_db else None, args.check)
+    else:
+        succeeded = execute(args.plan_file, args.workers, args.min_interval)
+    return 0 if succeeded else 1
 
 
 if __name__ == "__main__":
-    main()
+    import sys
+
+    sys.exit(main())
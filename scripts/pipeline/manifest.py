@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../out/manifests"))
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def db_content_digest(db_path, tables):
+    """Hash the rows of `tables`, independent of SQLite page layout and file change counters."""
+    digest = hashlib.sha256()
+    conn = sqlite3.connect(db_path)
+    try:
+        for table in tables:
+            digest.update(table.encode("utf-8"))
+            # Sort in Python: rollups refreshed incrementally are not stored in a canonical order.
+            for row in sorted(repr(row) for row in conn.execute(f"SELECT * FROM {table}")):
+                digest.update(row.encode("utf-8"))
+    finally:
+        conn.close()
+    return digest.hexdigest()
+
+
+def stage_key(*parts):
+    """Combine input digests and stage arguments into one key."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class BuildManifest:
+    """Per-repository record of which input key produced which stage outputs.
+
+    A stage is up to date when its recorded key equals the key of its current inputs and every
+    recorded output still exists with the digest it had when it was written. One file per
+    repository keeps parallel pipeline workers from writing the same manifest.
+    """
+
+    def __init__(self, repo, manifest_dir=MANIFEST_DIR):
+        self.path = os.path.join(manifest_dir, f"{repo}.json")
+        self.stages = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self.stages = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self.stages = {}
+
+    def is_fresh(self, stage, key):
+        entry = self.stages.get(stage)
+        if not entry or entry.get("key") != key or not entry.get("outputs"):
+            return False
+        for path, digest in entry["outputs"].items():
+            if not os.path.exists(path) or file_digest(path) != digest:
+                return False
+        return True
+
+    def record(self, stage, key, outputs):
+        self.stages[stage] = {
+            "key": key,
+            "outputs": {path: file_digest(path) for path in outputs if os.path.exists(path)},
+        }
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.stages, f, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
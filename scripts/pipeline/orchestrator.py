@@ -0,0 +1,184 @@
+import argparse
+import glob
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from scripts.db import generate_summary, sqlite_writer
+from scripts.logging.custom_logging import setup_logger
+from scripts.pipeline.manifest import BuildManifest, db_content_digest, file_digest, stage_key
+from scripts.util import fetch_all_discussions, plot
+from scripts.util.archive import find_archive
+from scripts.util.load_env import load_github_env_vars
+
+# (input archive, env file) pairs processed when no --repo is given
+DEFAULT_REPOS = [
+    ("static/vectordotdev_vector_issues.json", "vector.env"),
+    ("static/vectordotdev_vrl_issues.json", "vrl.env"),
+]
+
+
+def run_stage(manifest, timings, name, repo, force, key_func, outputs_func, func, *args, **kwargs):
+    """Run `func` unless the manifest shows its outputs were built from identical inputs.
+
+    `key_func` hashes the stage inputs (returning None if they cannot be hashed yet) and
+    `outputs_func` lists the files the stage produced, which are recorded with their digests.
+    Returns what `func` returned, or None if the stage was skipped.
+    """
+    key = key_func()
+    if not force and key is not None and manifest.is_fresh(name, key):
+        logging.info(f"[{repo}] {name}: inputs unchanged, skipping")
+        timings[name] = None
+        return None
+    logging.info(f"[{repo}] {name}: running...")
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings[name] = time.perf_counter() - started
+    if key is None:
+        key = key_func()
+    manifest.record(name, key, outputs_func())
+    return result
+
+
+def load_archive(input_path, repo_owner, repo_name, discussions_path=None):
+    issues = sqlite_writer.read_archive(input_path)
+    if not issues:
+        raise ValueError(f"No data found in {input_path}")
+    discussions = sqlite_writer.read_archive(discussions_path) if discussions_path else None
+    sqlite_writer.write_issues_to_sqlite(issues, sqlite_writer.OUTPUT_DIR, repo_owner, repo_name,
+                                         discussions=discussions)
+
+
+def run_repo(input_path, env_file, start_date=None, exclude_labels=None, force=False, plot_jobs=1,
+             palette_file=None, summary_formats=("csv",)):
+    """Run the load -> summarize -> plot stages for one repository.
+
+    Executed inside a pool worker, so pandas and matplotlib are only imported once per worker
+    no matter how many repositories it processes. The summary frames are handed to the plot
+    stage in memory; summary files are only a sink (`summary_formats`, possibly empty) and are
+    read back only when the summarize stage was skipped. Returns the repo name and per-stage
+    timings (None for skipped stages).
+    """
+    env = load_github_env_vars(env_file)
+    repo = f"{env['REPO_OWNER']}_{env['REPO_NAME']}"
+    db_path = os.path.join(sqlite_writer.OUTPUT_DIR, f"{repo}.db")
+    discussions_path = find_archive(fetch_all_discussions.archive_base_path(env["REPO_OWNER"], env["REPO_NAME"]))
+    summary_paths = generate_summary.summary_paths(env, summary_formats)
+    manifest = BuildManifest(repo)
+    timings = {}
+    summary_keys = []  # The database no longer changes once the load stage is done: hash it once
+
+    def summary_inputs_key():
+        if summary_keys:
+            return summary_keys[0]
+        if not os.path.exists(db_path):
+            return None
+        try:
+            summary_keys.append(stage_key(db_content_digest(db_path, generate_summary.SOURCE_TABLES)))
+        except sqlite3.Error:
+            return None  # No database or no rollups yet
+        return summary_keys[0]
+
+    def summarize_key():
+        # The summary files written depend on the formats too, not just the database.
+        key = summary_inputs_key()
+        return None if key is None else stage_key(key, sorted(summary_formats))
+
+    def plot_inputs_key():
+        key = summary_inputs_key()
+        return None if key is None else stage_key(key, start_date, exclude_labels, palette_file)
+
+    # DB from archive hashes; summaries, and the charts drawn from them, from the DB content hash.
+    run_stage(manifest, timings, "load", repo, force,
+              lambda: stage_key(file_digest(input_path), discussions_path and file_digest(discussions_path)),
+              lambda: [db_path],
+              load_archive, input_path, env["REPO_OWNER"], env["REPO_NAME"], discussions_path)
+    frames = run_stage(manifest, timings, "summarize", repo, force,
+                       summarize_key,
+                       lambda: summary_paths,
+                       generate_summary.generate_summaries, env, db_path, summary_formats)
+    run_stage(manifest, timings, "plot", repo, force,
+              plot_inputs_key,
+              lambda: glob.glob(os.path.join(plot.OUTPUT_DIR, f"{glob.escape(repo)}_*.png")),
+              plot.generate_plots, env, generate_summary.OUTPUT_DIR,
+              start_date=start_date, exclude_labels=exclude_labels, jobs=plot_jobs, palette_file=palette_file,
+              frames=frames)
+    return repo, timings
+
+
+def main():
+    setup_logger()
+
+    parser = argparse.ArgumentParser(description="Run the load, summarize and plot stages for several repositories.")
+    parser.add_argument(
+        "--repo",
+        nargs=2,
+        action="append",
+        metavar=("INPUT", "ENV_FILE"),
+        help="Issues archive and .env file of a repository (repeatable). Defaults to vector and vrl.",
+    )
+    parser.add_argument("--start", help="Only include data from this YYYY-MM date forward in the charts")
+    parser.add_argument(
+        "--exclude-labels",
+        help="Comma-separated list of labels to exclude from the label charts",
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Number of repositories processed in parallel")
+    parser.add_argument(
+        "--plot-jobs",
+        type=int,
+        help="Number of charts each repository renders in parallel (defaults to an even share of the CPUs)",
+    )
+    parser.add_argument(
+        "--summary-formats",
+        default="csv",
+        help="Comma-separated summary files to write: csv, feather, parquet or none "
+             "(charts are drawn from the in-memory summaries either way)",
+    )
+    parser.add_argument(
+        "--palette-file",
+        help="JSON file that pins label colors across runs and repositories (created if missing)",
+    )
+    parser.add_argument("--force", action="store_true",
+                        help="Run every stage even if the build manifest shows its inputs are unchanged")
+    args = parser.parse_args()
+
+    try:
+        summary_formats = generate_summary.parse_formats(args.summary_formats)
+    except (ValueError, ImportError) as e:
+        logging.error(e)
+        return 1
+
+    repos = args.repo or DEFAULT_REPOS
+    jobs = max(1, min(args.jobs or 1, len(repos)))
+    # Few repositories on many cores: let each one render its charts in parallel too.
+    plot_jobs = args.plot_jobs or max(1, (os.cpu_count() or 1) // jobs)
+    logging.info(f"Processing {len(repos)} repositories with {jobs} workers ({plot_jobs} chart workers each)...")
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=setup_logger) as executor:
+        futures = {
+            executor.submit(run_repo, input_path, env_file, args.start, args.exclude_labels, args.force,
+                            plot_jobs, args.palette_file, summary_formats): input_path
+            for input_path, env_file in repos
+        }
+        for future in as_completed(futures):
+            try:
+                repo, timings = future.result()
+            except Exception as e:
+                logging.error(f"Pipeline failed for {futures[future]}: {e}")
+                failures += 1
+                continue
+            summary = ", ".join(
+                f"{stage} {'skipped' if seconds is None else f'{seconds:.2f}s'}" for stage, seconds in timings.items()
+            )
+            logging.info(f"[{repo}] done: {summary}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import gzip
+import io
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:  # Optional, only needed for .zst archives
+    zstandard = None
+
+# Archive suffix by compression. Archives are NDJSON: one compact JSON object per line.
+ARCHIVE_SUFFIXES = {
+    "none": ".ndjson",
+    "gzip": ".ndjson.gz",
+    "zstd": ".ndjson.zst",
+}
+LEGACY_SUFFIX = ".json"  # Pretty-printed JSON array written by older versions of the fetchers
+READ_CHUNK_SIZE = 1 << 20
+
+
+def open_archive(path, mode):
+    """Open an archive for text reading ("r") or writing ("w"), picking the codec from its suffix."""
+    if path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("Reading or writing .zst archives requires the 'zstandard' package.")
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def find_archive(base_path):
+    """Return the first existing archive for `base_path` (a path without suffix), or None.
+    Streaming archives are preferred over a legacy JSON array."""
+    for suffix in list(ARCHIVE_SUFFIXES.values()) + [LEGACY_SUFFIX]:
+        if os.path.exists(base_path + suffix):
+            return base_path + suffix
+    return None
+
+
+class ArchiveWriter:
+    """Append-only NDJSON archive writer.
+
+    Items are written to a temporary file next to `path`, which only replaces `path` when the
+    writer is closed without an error, so a failed fetch never clobbers the previous archive.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Keep the real suffix last so open_archive() picks the right codec for the temp file.
+        root, ext = os.path.splitext(path)
+        self.tmp_path = f"{root}.tmp{ext}"
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self._file = open_archive(self.tmp_path, "w")
+        return self
+
+    def write(self, item):
+        self._file.write(json.dumps(item, separators=(",", ":")))
+        self._file.write("\n")
+        self.count += 1
+
+    def write_many(self, items):
+        for item in items:
+            self.write(item)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+        return False
+
+
+def _iter_json_array(f):
+    """Incrementally decode the elements of a top-level JSON array without loading it whole.
+
+    Decoding works from an offset into the buffer; the consumed prefix is only dropped when
+    another chunk is appended, so each element is copied a bounded number of times."""
+    decoder = json.JSONDecoder()
+    buffer, idx, eof = "", 0, False
+
+    def read_more():
+        nonlocal buffer, idx, eof
+        chunk = f.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[idx:] + chunk
+        idx = 0
+
+    def skip(chars):
+        nonlocal idx
+        while True:
+            while idx < len(buffer) and buffer[idx] in chars:
+                idx += 1
+            if idx < len(buffer) or eof:
+                return
+            read_more()
+
+    skip(" \t\r\n")
+    if not buffer.startswith("[", idx):
+        raise ValueError("Expected a JSON array")
+    idx += 1
+
+    while True:
+        skip(" \t\r\n,")
+        if buffer.startswith("]", idx):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, idx)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            read_more()
+            continue
+        # A number or literal running into the end of the buffer may continue in the next chunk.
+        if end == len(buffer) and not eof:
+            read_more()
+            continue
+        yield item
+        idx = end
+
+
+def iter_archive(path):
+    """Yield the items of an archive one at a time.
+
+    Accepts NDJSON (optionally .gz/.zst compressed) as well as legacy JSON-array files, so
+    memory stays flat regardless of the archive size.
+    """
+    with open_archive(path, "r") as f:
+        if path.endswith(LEGACY_SUFFIX):
+            yield from _iter_json_array(f)
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
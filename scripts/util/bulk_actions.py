@@ -0,0 +1,57 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DEFAULT_WORKERS = 4
+# GitHub asks to wait at least a second between mutating requests (POST, PATCH, PUT, DELETE)
+# to stay clear of its secondary rate limits.
+MUTATION_INTERVAL = 1.0
+
+
+class RateLimiter:
+    """Spaces out request starts by at least `min_interval` seconds across all threads."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def run_bulk(items, action, workers=DEFAULT_WORKERS, min_interval=MUTATION_INTERVAL, describe=str):
+    """Apply `action` to every item on a bounded thread pool and return one outcome per item.
+
+    `action(item)` returns a `(succeeded, detail)` pair; an exception counts as a failure.
+    Request starts are paced by a shared RateLimiter, while waiting on responses overlaps
+    across workers. Rate-limit responses themselves are retried by the GitHub client.
+    Outcomes are {"item", "succeeded", "detail"} dicts in completion order.
+    """
+    limiter = RateLimiter(min_interval)
+
+    def paced(item):
+        limiter.wait()
+        return action(item)
+
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(paced, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                succeeded, detail = future.result()
+            except Exception as e:
+                succeeded, detail = False, str(e)
+            if succeeded:
+                logging.info(f"{describe(item)}: {detail}")
+            else:
+                logging.warning(f"{describe(item)} failed: {detail}")
+            outcomes.append({"item": item, "succeeded": succeeded, "detail": detail})
+    return outcomes
@@ -1,115 +1,203 @@
 import argparse
-import json
 import logging
 import os
-
-import requests
+from concurrent.futures import ThreadPoolExecutor
 
 from scripts.logging.custom_logging import setup_logger
+from scripts.util.archive import ARCHIVE_SUFFIXES, ArchiveWriter, find_archive, iter_archive
+from scripts.util.github_client import get_client
 from scripts.util.load_env import load_github_env_vars
+from scripts.util.sync_state import (
+    IncompleteFetchError,
+    load_sync_state,
+    max_updated_at,
+    merge_items,
+    save_sync_state,
+    sync_state_path,
+)
 
-GRAPHQL_URL = "https://api.github.com/graphql"
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../out/historical/discussions"))
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+DEFAULT_WORKERS = 4  # Concurrent category walks when sharding
 
-
-def fetch_discussions(env, limit=100):
-    """Fetch GitHub discussions metadata via the GraphQL API."""
-    github_token = env["GITHUB_TOKEN"]
-    repo_owner = env["REPO_OWNER"]
-    repo_name = env["REPO_NAME"]
-
-    # https://docs.github.com/en/graphql/guides/using-the-graphql-api-for-discussions
-    query = """
-    query($owner: String!, $name: String!, $first: Int!, $after: String) {
-      repository(owner: $owner, name: $name) {
-        discussions(first: $first, after: $after) {
-          pageInfo {
-            endCursor
-            hasNextPage
-          }
-          nodes {
-            number
-            title
-            bodyText
-            url
-            createdAt
-            updatedAt
-            isAnswered
-            locked
-            author {
-              login
-            }
-            category {
-              name
-            }
-            comments {
-              totalCount
-            }
-            upvoteCount
-          }
+# https://docs.github.com/en/graphql/guides/using-the-graphql-api-for-discussions
+DISCUSSIONS_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String, $categoryId: ID) {
+  repository(owner: $owner, name: $name) {
+    discussions(first: $first, after: $after, categoryId: $categoryId,
+                orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo {
+        endCursor
+        hasNextPage
+      }
+      nodes {
+        number
+        title
+        bodyText
+        url
+        createdAt
+        updatedAt
+        isAnswered
+        locked
+        author {
+          login
         }
+        category {
+          name
+          isAnswerable
+        }
+        comments {
+          totalCount
+        }
+        upvoteCount
+      }
+    }
+  }
+}
+"""
+
+CATEGORIES_QUERY = """
+query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+    discussionCategories(first: 100) {
+      nodes {
+        id
+        name
       }
     }
+  }
+}
+"""
+
+
+def run_query(client, query, variables):
+    """Run a GraphQL query and return its `data`, or None (logged) on failure."""
+    response = client.graphql(query, variables)
+    if response.status_code != 200:
+        logging.warning(f"GraphQL request failed: {response.status_code}: {response.text}")
+        return None
+
+    result = response.json()
+    if "errors" in result:
+        logging.error(f"GraphQL errors: {result['errors']}")
+        return None
+    return result.get("data")
+
+
+def fetch_categories(env):
+    """Return the discussion categories of the repository as (id, name) pairs."""
+    client = get_client(env["GITHUB_TOKEN"])
+    data = run_query(client, CATEGORIES_QUERY, {"owner": env["REPO_OWNER"], "name": env["REPO_NAME"]})
+    if data is None:
+        raise RuntimeError("Could not fetch discussion categories")
+    return [(node["id"], node["name"]) for node in data["repository"]["discussionCategories"]["nodes"]]
+
+
+def fetch_discussions(env, limit=100, since=None, category=None):
+    """Fetch GitHub discussions metadata via the GraphQL API, most recently updated first.
+
+    With `since`, the walk stops at the first discussion updated before that ISO 8601
+    timestamp. A failed page raises IncompleteFetchError instead of returning a partial result:
+    pages are newest first, so a prefix would already carry the highest `updatedAt` and a sync
+    saved from it would hide every older discussion for good. `category` is an (id, name) pair
+    from `fetch_categories` to restrict the walk to.
     """
+    client = get_client(env["GITHUB_TOKEN"])
+    shard = f" in '{category[1]}'" if category else ""
 
     discussions = []
     has_next_page = True
     after = None
 
-    headers = {
-        "Authorization": f"Bearer {github_token}",
-        "Accept": "application/vnd.github+json"
-    }
-
     while has_next_page:
         variables = {
-            "owner": repo_owner,
-            "name": repo_name,
+            "owner": env["REPO_OWNER"],
+            "name": env["REPO_NAME"],
             "first": limit,
-            "after": after
+            "after": after,
+            "categoryId": category[0] if category else None,
         }
-        response = requests.post(GRAPHQL_URL, json={"query": query, "variables": variables}, headers=headers)
+        data = run_query(client, DISCUSSIONS_QUERY, variables)
+        if data is None:
+            raise IncompleteFetchError(f"Discussions fetch{shard} failed after {len(discussions)} discussions")
+
+        data = data.get("repository", {}).get("discussions", {})
+        nodes = data.get("nodes", [])
+        if since:
+            fresh = [node for node in nodes if node["updatedAt"] >= since]
+            if len(fresh) < len(nodes):
+                discussions.extend(fresh)
+                break
+        discussions.extend(nodes)
+        has_next_page = data.get("pageInfo", {}).get("hasNextPage", False)
+        after = data.get("pageInfo", {}).get("endCursor")
 
-        if response.status_code != 200:
-            logging.warning(f"GraphQL request failed: {response.status_code}: {response.text}")
-            break
+        logging.info(f"Fetched {len(discussions)} discussions{shard} so far...")
 
-        result = response.json()
+    return discussions
 
-        # Check for errors in GraphQL response
-        if "errors" in result:
-            logging.error(f"GraphQL errors: {result['errors']}")
-            break
 
-        # Continue as normal
-        data = result.get("data", {}).get("repository", {}).get("discussions", {})
+def fetch_discussions_sharded(env, limit=100, since=None, workers=DEFAULT_WORKERS):
+    """Walk every discussion category with its own cursor, `workers` categories at a time."""
+    categories = fetch_categories(env)
+    logging.info(f"Fetching {len(categories)} discussion categories with {workers} workers...")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        shards = list(executor.map(lambda category: fetch_discussions(env, limit, since, category), categories))
 
-        discussions.extend(data.get("nodes", []))
-        has_next_page = data.get("pageInfo", {}).get("hasNextPage", False)
-        after = data.get("pageInfo", {}).get("endCursor")
+    # A discussion moved to another category mid-walk can show up in two shards: keep the newest.
+    by_number = {}
+    for discussion in (discussion for shard in shards for discussion in shard):
+        current = by_number.get(discussion["number"])
+        if current is None or discussion["updatedAt"] > current["updatedAt"]:
+            by_number[discussion["number"]] = discussion
+    return list(by_number.values())
 
-        logging.info(f"Fetched {len(discussions)} discussions so far...")
 
-    return discussions
+def archive_base_path(repo_owner, repo_name):
+    return os.path.join(OUTPUT_DIR, f"{repo_owner}_{repo_name}_discussions")
 
 
-def write_to_json_file(discussions, repo_owner, repo_name):
-    json_out_file = os.path.join(OUTPUT_DIR, f"{repo_owner}_{repo_name}_discussions.json")
-    logging.info(f"Saving discussions to {json_out_file}...")
-    try:
-        with open(json_out_file, "w") as f:
-            json.dump(discussions, f, indent=4)
-        logging.info("Discussions saved successfully.")
-    except Exception as e:
-        logging.error(f"Error saving discussions: {e}")
+def load_high_water_mark(repo_owner, repo_name):
+    """Return the max `updatedAt` recorded by the last successful sync, or None."""
+    state = load_sync_state(sync_state_path(OUTPUT_DIR, repo_owner, repo_name))
+    return state.get("last_updated_at") if state else None
+
+
+def save_high_water_mark(discussions, previous, repo_owner, repo_name):
+    high_water_mark = max_updated_at(discussions, previous, field="updatedAt")
+    if not high_water_mark:
+        return
+    save_sync_state(sync_state_path(OUTPUT_DIR, repo_owner, repo_name), {"last_updated_at": high_water_mark})
+    logging.info(f"Discussions high-water mark for {repo_owner}/{repo_name} is now {high_water_mark}")
 
 
 def main():
     setup_logger()
     parser = argparse.ArgumentParser(description="Fetch GitHub discussions from a repository.")
     parser.add_argument("--limit", type=int, default=100, help="Number of discussions per page (max 100)")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch discussions updated since the last sync and merge them into the existing archive.",
+    )
+    parser.add_argument(
+        "--shard-by-category",
+        action="store_true",
+        help="Walk each discussion category with its own cursor, concurrently.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Number of categories fetched concurrently with --shard-by-category.",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=sorted(ARCHIVE_SUFFIXES),
+        default="gzip",
+        help="Compression of the NDJSON archive (zstd requires the 'zstandard' package).",
+    )
     parser.add_argument(
         "--env-file",
         type=str,
@@ -123,10 +211,40 @@ def main():
         print(f"Error loading environment variables: {e}")
         return 1
 
+    repo_owner = env["REPO_OWNER"]
+    repo_name = env["REPO_NAME"]
+    base_path = archive_base_path(repo_owner, repo_name)
+    out_path = base_path + ARCHIVE_SUFFIXES[args.compression]
+
     try:
         os.makedirs(OUTPUT_DIR, exist_ok=True)
-        discussions = fetch_discussions(env, limit=args.limit)
-        write_to_json_file(discussions, env["REPO_OWNER"], env["REPO_NAME"])
+        since = None
+        existing_path = None
+        if args.incremental:
+            since = load_high_water_mark(repo_owner, repo_name)
+            if since:
+                existing_path = out_path if os.path.exists(out_path) else find_archive(base_path)
+            if existing_path is None:
+                logging.info("No previous sync found, falling back to a full fetch.")
+                since = None
+
+        if args.shard_by_category:
+            discussions = fetch_discussions_sharded(env, limit=args.limit, since=since, workers=args.workers)
+        else:
+            discussions = fetch_discussions(env, limit=args.limit, since=since)
+
+        logging.info(f"Saving discussions to {out_path}...")
+        with ArchiveWriter(out_path) as writer:
+            if existing_path:
+                logging.info(f"Merging {len(discussions)} updated discussions into {existing_path}...")
+                writer.write_many(merge_items(iter_archive(existing_path), discussions, "number"))
+            else:
+                writer.write_many(discussions)
+        logging.info(f"Saved {writer.count} discussions to {out_path}")
+
+        # Only advance the high-water mark once the archive is safely on disk; a truncated walk
+        # raises inside the writer and never gets here.
+        save_high_water_mark(discussions, since, repo_owner, repo_name)
     except Exception as e:
         print(f"Error fetching discussions: {e}")
         return 1
@@ -2,79 +2,193 @@ import argparse
 import json
 import logging
 import os
-
-import requests
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from scripts.logging.custom_logging import setup_logger
+from scripts.util.archive import ARCHIVE_SUFFIXES, ArchiveWriter, find_archive, iter_archive
+from scripts.util.github_client import API_URL, get_client
+from scripts.util.graphql_issues import iter_issue_pages_graphql
 from scripts.util.load_env import load_github_env_vars
+from scripts.util.sync_state import (
+    IncompleteFetchError,
+    load_sync_state,
+    max_updated_at,
+    merge_items,
+    save_sync_state,
+    sync_state_path,
+)
 
 # Constants
-API_BASE_URL = "https://api.github.com/repos"
+API_BASE_URL = f"{API_URL}/repos"
 BATCH_SIZE = 100  # Max issues per page (GitHub API maximum is 100)
+DEFAULT_WORKERS = 8  # Concurrent page fetches once the last page is known
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../out/historical/issues"))
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
-def fetch_issues(env, include_closed=False):
-    """Fetch all issues from the GitHub API (open by default, or all if include_closed).
-    Logs warnings and errors but always returns collected issues, even on partial failure."""
+def parse_last_page(link_header):
+    """Return the page number of the `rel="last"` link in a GitHub `Link` header, or None."""
+    for part in link_header.split(","):
+        if 'rel="last"' not in part:
+            continue
+        match = re.search(r"[?&]page=(\d+)", part)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def fetch_issues_page(client, url, params, page):
+    """Fetch a single page of issues. Returns (items, response), or (None, None) on failure."""
+    logging.info(f"Fetching page {page} (batch size: {BATCH_SIZE}, state: {params['state']}, since: {params.get('since')})...")
+    try:
+        response = client.get_cached(url, params={**params, "page": page})
+        if response.status_code != 200:
+            logging.warning(f"API request failed on page {page} - Status {response.status_code}: {response.text}")
+            return None, None
+
+        try:
+            return response.json(), response
+        except json.JSONDecodeError:
+            logging.warning(f"Failed to decode JSON on page {page}. Response: {response.text}")
+            return None, None
+
+    except Exception as e:
+        logging.error(f"Unexpected failure on page {page}: {e}")
+        return None, None
+
+
+def iter_updated_issue_pages(client, url, params, since):
+    """Yield pages of the items updated at or after `since`, oldest update first.
 
-    github_token = env["GITHUB_TOKEN"]
+    Paging by number is unsafe here: an item updated mid-walk moves to the end of the list and
+    shifts every later item back by one, so one of them would slip onto an already fetched page.
+    Instead every request restarts from page 1 with `since` set to the last `updated_at` seen
+    (keyset pagination). Items at that exact timestamp come back again, so the pages may repeat
+    items (and items updated mid-walk come again at the end); `fetch_issues` keeps the last copy.
+    Only when a whole page shares one timestamp does the walk move to the next page number.
+    """
+    cursor, page, request = since, 1, 1
+    while True:
+        data, _ = fetch_issues_page(client, url, {**params, "since": cursor}, page)
+        if data is None:
+            raise IncompleteFetchError(f"Failed to fetch issues updated since {cursor} (request {request})")
+        if data:
+            yield data
+        if len(data) < BATCH_SIZE:
+            logging.info("Reached the last page of updated issues.")
+            return
+        last_seen = max(issue["updated_at"] for issue in data)
+        page = page + 1 if last_seen == cursor else 1
+        cursor = last_seen
+        request += 1
+
+
+def iter_issue_pages(env, include_closed=False, since=None, workers=DEFAULT_WORKERS):
+    """Yield pages of issues from the GitHub API (open by default, or all if include_closed).
+    If `since` is given, only items updated at or after that ISO 8601 timestamp are fetched,
+    oldest update first, through `iter_updated_issue_pages`.
+
+    Otherwise the first page is fetched alone; once its `Link` header reveals the last page number, the
+    remaining pages are fetched concurrently by up to `workers` threads and yielded in order.
+    At most `2 * workers` pages are in flight or buffered, so memory does not grow with the repo.
+    Raises IncompleteFetchError at the first failed page: a prefix of a full walk (sorted by
+    creation) says nothing about older items, so callers must not treat it as complete."""
+
+    client = get_client(env["GITHUB_TOKEN"])
     repo_owner = env["REPO_OWNER"]
     repo_name = env["REPO_NAME"]
 
+    url = f"{API_BASE_URL}/{repo_owner}/{repo_name}/issues"
     state = "all" if include_closed else "open"
-    issues = []
-    page = 1
+    params = {"state": state, "per_page": BATCH_SIZE}
+    if since:
+        params.update({"sort": "updated", "direction": "asc"})
+        yield from iter_updated_issue_pages(client, url, params, since)
+        return
 
-    while True:
-        logging.info(f"Fetching page {page} (batch size: {BATCH_SIZE}, state: {state})...")
-        try:
-            response = requests.get(
-                f"{API_BASE_URL}/{repo_owner}/{repo_name}/issues",
-                params={"state": state, "per_page": BATCH_SIZE, "page": page},
-                headers={"Authorization": f"token {github_token}"}
-            )
-            if response.status_code != 200:
-                logging.warning(f"API request failed on page {page} - Status {response.status_code}: {response.text}")
-                break
+    data, response = fetch_issues_page(client, url, params, 1)
+    if data is None:
+        raise IncompleteFetchError("Failed to fetch page 1 of issues")
+    if not data:
+        logging.info("No issues to fetch.")
+        return
 
-            try:
-                data = response.json()
-            except json.JSONDecodeError:
-                logging.warning(f"Failed to decode JSON on page {page}. Response: {response.text}")
-                break
+    yield data
+    last_page = parse_last_page(response.headers.get("Link", ""))
+    if last_page is None or last_page <= 1:
+        logging.info("Reached the last page of issues.")
+        return
 
-            if not data:
-                logging.info("No more issues to fetch.")
-                break
+    workers = max(1, workers)
+    logging.info(f"Fetching pages 2-{last_page} with {workers} workers...")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        next_page = 2
+        while pending or next_page <= last_page:
+            while next_page <= last_page and len(pending) < 2 * workers:
+                pending.append((next_page, executor.submit(fetch_issues_page, client, url, params, next_page)))
+                next_page += 1
 
-            issues.extend(data)
-            logging.info(f"Page {page} fetched. Total issues collected: {len(issues)}")
+            # Waiting on the oldest future first reassembles the pages in order.
+            page, future = pending.popleft()
+            data = future.result()[0]
+            if data is None:
+                for _, later in pending:
+                    later.cancel()
+                raise IncompleteFetchError(f"Failed to fetch page {page} of {last_page} of issues")
+            logging.info(f"Page {page} of {last_page} fetched.")
+            yield data
 
-            if len(data) < BATCH_SIZE:
-                logging.info("Reached the last page of issues.")
-                break
 
-            page += 1
+def iter_pages(env, api="rest", include_closed=False, since=None, workers=DEFAULT_WORKERS):
+    """Yield pages of REST-shaped issues through the REST (`iter_issue_pages`) or the GraphQL
+    (`graphql_issues.iter_issue_pages_graphql`) API."""
+    if api == "graphql":
+        return iter_issue_pages_graphql(env, include_closed=include_closed, since=since)
+    return iter_issue_pages(env, include_closed=include_closed, since=since, workers=workers)
 
-        except Exception as e:
-            logging.error(f"Unexpected failure on page {page}: {e}")
-            break
 
-    return issues
+def fetch_issues(env, include_closed=False, since=None, workers=DEFAULT_WORKERS, api="rest"):
+    """Fetch all issues into a list. See `iter_issue_pages` for the fetch semantics.
+    Raises IncompleteFetchError rather than returning a partial result. An item that came back
+    more than once (see `iter_updated_issue_pages`) is kept once, in its last fetched version."""
+    issues = {}
+    for page in iter_pages(env, api=api, include_closed=include_closed, since=since, workers=workers):
+        for issue in page:
+            issues.pop(issue["id"], None)
+            issues[issue["id"]] = issue
+    logging.info(f"Total issues collected: {len(issues)}")
+    return list(issues.values())
 
 
-def write_to_json_file(issues, repo_owner, repo_name):
-    json_out_file = os.path.join(OUTPUT_DIR, f"{repo_owner}_{repo_name}_issues.json")
-    logging.info(f"Saving raw issues with URLs to {json_out_file}...")
-    try:
-        with open(json_out_file, "w") as f:
-            json.dump(issues, f, indent=4)
-        logging.info(f"Issues saved to {json_out_file}")
-    except Exception as e:
-        logging.error(f"Error saving issues JSON file: {e}")
+def archive_base_path(repo_owner, repo_name):
+    return os.path.join(OUTPUT_DIR, f"{repo_owner}_{repo_name}_issues")
+
+
+def load_high_water_mark(repo_owner, repo_name, api="rest"):
+    """Return the max `updated_at` recorded by the last successful sync, or None.
+
+    Also None if that sync used the other API: pull request ids differ between REST and
+    GraphQL, so merging across them would duplicate pull requests.
+    """
+    state = load_sync_state(sync_state_path(OUTPUT_DIR, repo_owner, repo_name))
+    if state is None:
+        return None
+    if state.get("api", "rest") != api:
+        logging.info(f"The archive was fetched through the {state.get('api', 'rest')} API, not {api}.")
+        return None
+    return state.get("last_updated_at")
+
+
+def save_high_water_mark(high_water_mark, repo_owner, repo_name, api="rest"):
+    if not high_water_mark:
+        return
+    state = {"last_updated_at": high_water_mark, "api": api}
+    save_sync_state(sync_state_path(OUTPUT_DIR, repo_owner, repo_name), state)
+    logging.info(f"Sync high-water mark for {repo_owner}/{repo_name} is now {high_water_mark}")
 
 
 def main():
@@ -87,6 +201,30 @@ def main():
         default=True,
         help="Include closed issues as well as open issues in the fetch."
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch items updated since the last sync and merge them into the existing archive.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Number of pages to fetch concurrently once the last page number is known.",
+    )
+    parser.add_argument(
+        "--api",
+        choices=["rest", "graphql"],
+        default="rest",
+        help="API to fetch through. GraphQL only transfers the fields the database uses, but reports "
+             "different pull request ids than REST, so switching APIs triggers a full fetch.",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=sorted(ARCHIVE_SUFFIXES),
+        default="gzip",
+        help="Compression of the NDJSON archive (zstd requires the 'zstandard' package).",
+    )
     parser.add_argument(
         "--env-file",
         type=str,
@@ -101,13 +239,45 @@ def main():
         print(f"Error loading environment variables: {e}")
         return 1
 
+    repo_owner = env['REPO_OWNER']
+    repo_name = env['REPO_NAME']
+    base_path = archive_base_path(repo_owner, repo_name)
+    out_path = base_path + ARCHIVE_SUFFIXES[args.compression]
+
     # Fetch issues using the GitHub API
     try:
         os.makedirs(OUTPUT_DIR, exist_ok=True)
-        issues = fetch_issues(env, include_closed=args.include_closed)
-        write_to_json_file(issues,
-                           repo_owner=env['REPO_OWNER'],
-                           repo_name=env['REPO_NAME'])
+        since = None
+        existing_path = None
+        if args.incremental:
+            since = load_high_water_mark(repo_owner, repo_name, api=args.api)
+            if since:
+                existing_path = out_path if os.path.exists(out_path) else find_archive(base_path)
+            if existing_path is None:
+                logging.info("No previous sync found, falling back to a full fetch.")
+                since = None
+
+        # Incremental syncs must see closed items too, otherwise closures are never picked up.
+        include_closed = args.include_closed or since is not None
+        high_water_mark = since
+
+        logging.info(f"Streaming issues to {out_path}...")
+        # A truncated fetch raises inside the writer, which then keeps the previous archive.
+        with ArchiveWriter(out_path) as writer:
+            if existing_path:
+                delta = fetch_issues(env, include_closed=include_closed, since=since, workers=args.workers,
+                                     api=args.api)
+                high_water_mark = max_updated_at(delta, high_water_mark)
+                logging.info(f"Merging {len(delta)} updated items into {existing_path}...")
+                writer.write_many(merge_items(iter_archive(existing_path), delta, "id"))
+            else:
+                for page in iter_pages(env, api=args.api, include_closed=include_closed, workers=args.workers):
+                    high_water_mark = max_updated_at(page, high_water_mark)
+                    writer.write_many(page)
+        logging.info(f"Saved {writer.count} issues to {out_path}")
+
+        # Only advance the high-water mark once the archive is safely on disk.
+        save_high_water_mark(high_water_mark, repo_owner, repo_name, api=args.api)
     except Exception as e:
         print(f"Error fetching issues: {e}")
         return 1
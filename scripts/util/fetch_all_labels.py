@@ -1,8 +1,7 @@
 import json
 import os
 
-import requests
-
+from scripts.util.github_client import API_URL, get_client
 from scripts.util.load_env import load_github_env_vars
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,14 +10,12 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
 def fetch_all_labels(env):
-    # Load the GitHub token
-    github_token = env["GITHUB_TOKEN"]
+    client = get_client(env["GITHUB_TOKEN"])
     repo_owner = env["REPO_OWNER"]
     repo_name = env["REPO_NAME"]
 
     # GitHub API endpoint for repository labels
-    api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/labels"
-    headers = {"Authorization": f"token {github_token}", "Accept": "application/vnd.github.v3+json"}
+    api_url = f"{API_URL}/repos/{repo_owner}/{repo_name}/labels"
 
     labels = []
     page = 1
@@ -26,7 +23,7 @@ def fetch_all_labels(env):
 
     while True:
         print(f"Fetching page {page} of labels...")
-        response = requests.get(api_url, headers=headers, params={"per_page": per_page, "page": page})
+        response = client.get_cached(api_url, params={"per_page": per_page, "page": page})
 
         if response.status_code != 200:
             raise Exception(f"API request failed: {response.status_code} - {response.text}")
@@ -0,0 +1,175 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts.util.http_cache import build_response, get_default_cache
+
+API_URL = "https://api.github.com"
+GRAPHQL_URL = f"{API_URL}/graphql"
+
+MAX_RETRIES = 5  # Attempts after the first one, for transient errors and rate limits
+BACKOFF_BASE = 1.0  # Seconds, doubled on every retry
+BACKOFF_MAX = 60.0  # Upper bound for a single exponential backoff sleep
+RATE_LIMIT_MAX_WAIT = 3600.0  # Primary rate limits reset at most an hour later
+SECONDARY_RATE_LIMIT_WAIT = 60.0  # GitHub asks to wait at least a minute when no hint is given
+MAX_CONCURRENCY_PER_HOST = 8  # In-flight requests per host, shared by all threads
+RETRY_STATUSES = {500, 502, 503, 504}
+DEFAULT_TIMEOUT = (10.0, 60.0)  # Seconds to connect and between bytes read, unless the caller passes one
+# Methods that can be resent after a 5xx or a dropped connection without applying them twice.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class GitHubClient:
+    """A pooled, retrying HTTP client for the GitHub REST and GraphQL APIs.
+
+    One `requests.Session` keeps TLS connections alive across requests, and every request has a
+    timeout. Transient failures (connection errors, 5xx) of idempotent requests are retried
+    with exponential backoff and jitter, rate limits wait
+    for `Retry-After` / `X-RateLimit-Reset`, and a per-host semaphore bounds concurrency when
+    the client is shared between threads.
+    """
+
+    def __init__(self, token, max_retries=MAX_RETRIES, max_concurrency=MAX_CONCURRENCY_PER_HOST):
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github+json",
+        })
+        self._host_limits = {}
+        self._host_limits_lock = threading.Lock()
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_concurrency)
+            return self._host_limits[host]
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """Send a request, retrying transient errors and rate limits.
+
+        Returns the last response once it is final (or retries are exhausted), so callers keep
+        checking `status_code` as usual. Re-raises the last connection error if every attempt failed.
+
+        A request that is not `idempotent` (by default: not in IDEMPOTENT_METHODS) may already
+        have been applied when it fails with a 5xx or a dropped connection, so it is only
+        retried when it was rejected by a rate limit or never reached the server.
+        """
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        limit = self._host_limit(url)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with limit:
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                never_sent = isinstance(e, requests.exceptions.ConnectTimeout)
+                if attempt == self.max_retries or not (idempotent or never_sent):
+                    raise
+                delay = backoff_delay(attempt)
+                logging.warning(f"{method} {url} failed ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+
+            delay = retry_delay(response, attempt, idempotent)
+            if delay is None or attempt == self.max_retries:
+                return response
+
+            logging.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s "
+                            f"(attempt {attempt + 1}/{self.max_retries})...")
+            time.sleep(delay)
+
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def get_cached(self, url, params=None, cache=None, **kwargs):
+        """GET `url` with `If-None-Match` from the on-disk response cache.
+
+        A 304 Not Modified (which GitHub does not count against the rate limit) is turned back
+        into the cached 200 response, so callers cannot tell the difference.
+        """
+        cache = cache or get_default_cache()
+        key = cache.key(url, params)
+        entry = cache.get(key)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry:
+            headers["If-None-Match"] = entry["etag"]
+
+        response = self.get(url, params=params, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            logging.debug(f"Not modified, serving {url} from cache")
+            return build_response(entry, response)
+        if response.status_code == 200:
+            cache.put(key, url, response)
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def graphql(self, query, variables=None):
+        # Only queries are sent through here, so resending one is safe.
+        return self.post(GRAPHQL_URL, json={"query": query, "variables": variables or {}}, idempotent=True)
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def is_rate_limited(response):
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    if response.headers.get("Retry-After") or response.headers.get("X-RateLimit-Remaining") == "0":
+        return True
+    return "rate limit" in response.text.lower()
+
+
+def retry_delay(response, attempt, idempotent=True):
+    """Return how long to wait before retrying `response`, or None if it should not be retried.
+    Server errors are only retried for idempotent requests; rate-limited requests were not applied."""
+    if response.status_code in RETRY_STATUSES:
+        return backoff_delay(attempt) if idempotent else None
+    if not is_rate_limited(response):
+        return None
+
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), RATE_LIMIT_MAX_WAIT)
+
+    reset = response.headers.get("X-RateLimit-Reset")
+    if response.headers.get("X-RateLimit-Remaining") == "0" and reset and reset.isdigit():
+        # Add a second of slack for clock skew between us and GitHub.
+        return min(max(float(reset) - time.time(), 0.0) + 1.0, RATE_LIMIT_MAX_WAIT)
+
+    return SECONDARY_RATE_LIMIT_WAIT + backoff_delay(attempt)
+
+
+def get_client(token):
+    """Return the process-wide client for `token`, creating it on first use."""
+    with _clients_lock:
+        if token not in _clients:
+            _clients[token] = GitHubClient(token)
+        return _clients[token]
@@ -0,0 +1,174 @@
+import logging
+
+from scripts.util.fetch_all_labels import fetch_all_labels
+from scripts.util.github_client import get_client
+from scripts.util.sync_state import IncompleteFetchError
+
+PAGE_SIZE = 100  # Max nodes per GraphQL connection page
+LABELS_PER_ITEM = 100
+
+# Only the fields sqlite_writer reads, instead of the full REST payload (user objects,
+# reactions and a dozen URLs per item). The body feeds the full-text search index.
+ITEM_FIELDS = """
+    databaseId
+    number
+    title
+    body
+    state
+    createdAt
+    updatedAt
+    closedAt
+    author {
+      login
+    }
+    labels(first: %d) {
+      nodes {
+        id
+        name
+        color
+        description
+      }
+    }
+""" % LABELS_PER_ITEM
+
+QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String, $states: [%(state_type)s!], $field: %(order_type)s!) {
+  repository(owner: $owner, name: $name) {
+    %(connection)s(first: $first, after: $after, states: $states, orderBy: {field: $field, direction: DESC}) {
+      pageInfo {
+        endCursor
+        hasNextPage
+      }
+      nodes {
+        %(fields)s
+      }
+    }
+  }
+}
+"""
+
+# Connection name -> query. Pull requests also carry what the REST `pull_request` object,
+# `draft` flag and (from `/pulls`) `head` provide.
+QUERIES = {
+    "issues": QUERY % {
+        "state_type": "IssueState",
+        "order_type": "IssueOrderField",
+        "connection": "issues",
+        "fields": ITEM_FIELDS,
+    },
+    "pullRequests": QUERY % {
+        "state_type": "PullRequestState",
+        "order_type": "IssueOrderField",
+        "connection": "pullRequests",
+        "fields": ITEM_FIELDS + """
+        isDraft
+        mergedAt
+        headRefName
+        headRepository {
+          nameWithOwner
+        }
+        """,
+    },
+}
+
+
+def label_ids_by_node_id(env):
+    """Map GraphQL label node ids to the numeric REST label ids the database is keyed by.
+    GraphQL labels expose no numeric id, so this costs one (cached) REST listing."""
+    return {label["node_id"]: label["id"] for label in fetch_all_labels(env)}
+
+
+def to_rest_item(node, is_pull_request, label_ids):
+    """Convert a GraphQL issue or pull request node into the subset of the REST `/issues`
+    item shape that sqlite_writer reads.
+
+    Note that for pull requests `id` is the pull request's database id, whereas REST
+    `/issues` reports the id of the underlying issue.
+    """
+    item = {
+        "id": node["databaseId"],
+        "number": node["number"],
+        "title": node["title"],
+        "body": node.get("body"),
+        "state": "open" if node["state"] == "OPEN" else "closed",  # MERGED is closed in REST
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "closed_at": node["closedAt"],
+        "user": {"login": node["author"]["login"]} if node.get("author") else None,
+        "labels": [
+            {
+                "id": label_ids.get(label["id"]),
+                "name": label["name"],
+                "color": label["color"],
+                "description": label["description"],
+            }
+            for label in node["labels"]["nodes"]
+        ],
+    }
+    if is_pull_request:
+        item["pull_request"] = {"merged_at": node.get("mergedAt")}
+        item["draft"] = node.get("isDraft", False)
+        head_repository = node.get("headRepository")
+        item["head"] = {
+            "ref": node.get("headRefName"),
+            "repo": {"full_name": head_repository["nameWithOwner"]} if head_repository else None,
+        }
+    return item
+
+
+def iter_connection_pages(client, env, connection, states, since=None):
+    """Yield the node lists of one connection, most recently created (or, with `since`,
+    updated) first. With `since` the walk stops at the first node updated before it.
+
+    A failed page raises IncompleteFetchError, like the REST fetch: a prefix of either walk
+    would leave older items out of the archive or move the high-water mark past them.
+    """
+    variables = {
+        "owner": env["REPO_OWNER"],
+        "name": env["REPO_NAME"],
+        "first": PAGE_SIZE,
+        "after": None,
+        "states": states,
+        "field": "UPDATED_AT" if since else "CREATED_AT",
+    }
+    fetched = 0
+
+    while True:
+        response = client.graphql(QUERIES[connection], variables)
+        result = response.json() if response.status_code == 200 else {}
+        if response.status_code != 200 or "errors" in result:
+            raise IncompleteFetchError(f"GraphQL request for {connection} failed after {fetched} {connection}: "
+                                       f"{response.status_code}: {response.text}")
+
+        data = result["data"]["repository"][connection]
+        nodes = data["nodes"]
+        if since:
+            fresh = [node for node in nodes if node["updatedAt"] >= since]
+            done = len(fresh) < len(nodes)
+            nodes = fresh
+        else:
+            done = False
+
+        fetched += len(nodes)
+        logging.info(f"Fetched {fetched} {connection} so far...")
+        if nodes:
+            yield nodes
+
+        if done or not data["pageInfo"]["hasNextPage"]:
+            return
+        variables["after"] = data["pageInfo"]["endCursor"]
+
+
+def iter_issue_pages_graphql(env, include_closed=False, since=None):
+    """GraphQL counterpart of `fetch_all_issues_and_prs.iter_issue_pages`: yield pages of
+    REST-shaped issues, then pull requests, requesting only the fields the database uses."""
+    client = get_client(env["GITHUB_TOKEN"])
+    label_ids = label_ids_by_node_id(env)
+
+    for connection, states in (
+            ("issues", ["OPEN", "CLOSED"] if include_closed else ["OPEN"]),
+            ("pullRequests", ["OPEN", "CLOSED", "MERGED"] if include_closed else ["OPEN"]),
+    ):
+        is_pull_request = connection == "pullRequests"
+        for nodes in iter_connection_pages(client, env, connection, states, since=since):
+            yield [to_rest_item(node, is_pull_request, label_ids) for node in nodes]
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../out/cache/http"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MiB
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+class ResponseCache:
+    """On-disk cache of GitHub responses for conditional (`If-None-Match`) requests.
+
+    Each entry is one JSON file holding the URL, ETag, a few headers (notably `Link`, which
+    drives pagination) and the body. Recency is tracked with file mtimes, so the LRU order
+    survives across runs; once the total size exceeds `max_bytes` the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # key -> size in bytes, least recently used first
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        files = []
+        for name in os.listdir(cache_dir):
+            if not name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(cache_dir, name))
+            files.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def key(url, params=None):
+        canonical = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached entry for `key` and mark it as most recently used, or None."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                os.utime(path)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"Dropping unreadable cache entry {path}: {e}")
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, url, response):
+        """Store a 200 response that carries an ETag, then evict entries over the size cap."""
+        etag = response.headers.get("ETag")
+        if not etag:
+            return
+        entry = {
+            "url": url,
+            "etag": etag,
+            "headers": {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers},
+            "body": response.text,
+        }
+        data = json.dumps(entry).encode("utf-8")
+        with self._lock:
+            path = self._path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            self._total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+
+    def _remove(self, key):
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        # Never evict the entry that was just written, even if it alone exceeds the cap.
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            logging.debug(f"Evicting cache entry {oldest}")
+            self._remove(oldest)
+
+
+def build_response(entry, not_modified):
+    """Rebuild a 200 response from a cache entry, keeping the rate-limit headers of the 304."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = entry["url"]
+    response.encoding = "utf-8"
+    response._content = entry["body"].encode("utf-8")
+    response.headers = CaseInsensitiveDict(not_modified.headers)
+    response.headers.update(entry["headers"])
+    return response
+
+
+def get_default_cache():
+    """Return the process-wide cache under out/cache/http, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
@@ -0,0 +1,117 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+
+import matplotlib.colors as mcolors
+
+# Custom label color overrides
+COLOR_MAP = {
+    "type: bug": "#FF4C4C",
+    "type: feature": "#4C9AFF",
+    "type: enhancement": "#36B37E",
+    "domain: external docs": "#afab7e",
+    "domain: ci": "#d6c720",
+    "domain: deps": "#1f3f18",
+    "domain: core": "#b50036",
+    "domain: sources": "#2dbcbc",
+    "domain: transforms": "#8615bf",
+    "domain: sinks": "#ad4f47",
+    "open_issues": "#070707",
+    "closed_issues": "#27b01c",
+    "open_pull_requests": "#070707",
+    "closed_pull_requests": "#27b01c",
+}
+
+# Built once; every other label picks one of these
+CSS4_COLORS = tuple(mcolors.CSS4_COLORS.values())
+MEMO_SIZE = 4096  # Distinct labels remembered per process
+
+_palette = None
+_palette_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def hashed_color(label_name):
+    """Pick a color from the label name alone, so it is the same in every chart and repo.
+
+    Uses a private RNG seeded from the MD5 of the name, which yields the same color the
+    previous `random.seed()` implementation did without touching the global RNG state.
+    """
+    seed = int(hashlib.md5(label_name.encode()).hexdigest(), 16)
+    return random.Random(seed).choice(CSS4_COLORS)
+
+
+class LabelPalette:
+    """Label -> color assignments, optionally persisted to a JSON file.
+
+    Colors come from `COLOR_MAP`, then from the file, then from `hashed_color`. New
+    assignments are written back on `save()`, so colors stay pinned across runs and
+    repositories even if the named color list changes; entries can be edited by hand.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.colors = self._load() if path else {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Ignoring unreadable palette file {self.path}: {e}")
+            return {}
+
+    def color(self, label_name):
+        if label_name in COLOR_MAP:
+            return COLOR_MAP[label_name]
+        color = self.colors.get(label_name)
+        if color is None:
+            color = hashed_color(label_name)
+            if self.path:
+                with self._lock:
+                    self.colors[label_name] = color
+                    self._dirty = True
+        return color
+
+    def save(self):
+        """Write new assignments, merged with whatever other processes saved meanwhile."""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            # Entries already on disk win, so concurrent writers never recolor a label.
+            self.colors.update(self._load())
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.colors, f, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def load_palette(path=None):
+    """Set the process-wide palette, persisting assignments to `path` if given."""
+    global _palette
+    with _palette_lock:
+        _palette = LabelPalette(path)
+        return _palette
+
+
+def get_palette():
+    """Return the process-wide palette, creating an in-memory one on first use."""
+    global _palette
+    with _palette_lock:
+        if _palette is None:
+            _palette = LabelPalette()
+        return _palette
+
+
+def get_label_color(label_name):
+    return get_palette().color(label_name)
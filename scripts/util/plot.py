@@ -1,58 +1,48 @@
 import argparse
-import hashlib
+import functools
 import logging
 import os
-import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-import matplotlib.colors as mcolors
-import matplotlib.pyplot as plt
+import matplotlib as mpl
 import numpy as np
 import pandas as pd
+from matplotlib.figure import Figure
 from matplotlib.ticker import MaxNLocator
 
+try:
+    import pyarrow
+except ImportError:  # Optional, only needed to load Feather/Parquet summaries
+    pyarrow = None
+
+from scripts.db.generate_summary import FORMAT_SUFFIXES
 from scripts.logging.custom_logging import setup_logger
 from scripts.util.load_env import load_github_env_vars
+from scripts.util.palette import COLOR_MAP, get_label_color, get_palette, load_palette
 
 # Constants
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "../../out/images"))
 os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# Custom label color overrides
-COLOR_MAP = {
-    "type: bug": "#FF4C4C",
-    "type: feature": "#4C9AFF",
-    "type: enhancement": "#36B37E",
-    "domain: external docs": "#afab7e",
-    "domain: ci": "#d6c720",
-    "domain: deps": "#1f3f18",
-    "domain: core": "#b50036",
-    "domain: sources": "#2dbcbc",
-    "domain: transforms": "#8615bf",
-    "domain: sinks": "#ad4f47",
-    "open_issues": "#070707",
-    "closed_issues": "#27b01c",
-    "open_pull_requests": "#070707",
-    "closed_pull_requests": "#27b01c",
-}
+SUMMARY_LOAD_ORDER = ["feather", "parquet", "csv"]  # Fastest to load first
 
 
 def setup_styles():
-    plt.rcParams["font.family"] = "DejaVu Sans"
-    plt.rcParams["font.size"] = 12
-    plt.rcParams["axes.titlesize"] = 16
-    plt.rcParams["axes.labelsize"] = 12
-    plt.rcParams["xtick.labelsize"] = 10
-    plt.rcParams["ytick.labelsize"] = 10
-    plt.rcParams["axes.spines.top"] = False
-    plt.rcParams["axes.spines.right"] = False
-    plt.rcParams["axes.spines.left"] = True
-    plt.rcParams["axes.spines.bottom"] = True
-    plt.rcParams["axes.axisbelow"] = True
-    plt.rcParams["axes.grid"] = True
-    plt.rcParams["grid.alpha"] = 0.5
-    plt.rcParams["grid.linestyle"] = "--"  # make all grids dashed
-    plt.rcParams["grid.linewidth"] = 0.7
+    mpl.rcParams["font.family"] = "DejaVu Sans"
+    mpl.rcParams["font.size"] = 12
+    mpl.rcParams["axes.titlesize"] = 16
+    mpl.rcParams["axes.labelsize"] = 12
+    mpl.rcParams["xtick.labelsize"] = 10
+    mpl.rcParams["ytick.labelsize"] = 10
+    mpl.rcParams["axes.spines.top"] = False
+    mpl.rcParams["axes.spines.right"] = False
+    mpl.rcParams["axes.spines.left"] = True
+    mpl.rcParams["axes.spines.bottom"] = True
+    mpl.rcParams["axes.axisbelow"] = True
+    mpl.rcParams["axes.grid"] = True
+    mpl.rcParams["grid.alpha"] = 0.5
+    mpl.rcParams["grid.linestyle"] = "--"  # make all grids dashed
+    mpl.rcParams["grid.linewidth"] = 0.7
 
 
 def set_axis_labels(ax, xlabel, ylabel):
@@ -62,140 +52,235 @@ def set_axis_labels(ax, xlabel, ylabel):
 
 def main():
     setup_logger()
-    setup_styles()
 
     parser = argparse.ArgumentParser(description="Generate visual summaries from GitHub issues CSVs.")
-    parser.add_argument("--input-dir", required=True, help="Directory containing the summary CSV files")
+    parser.add_argument("--input-dir", required=True, help="Directory containing the summary files (CSV, Feather or Parquet)")
     parser.add_argument("--start", help="Only include data from this YYYY-MM date forward")
     parser.add_argument(
         "--exclude-labels",
         help="Comma-separated list of labels to exclude from the label time-series chart",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of charts rendered in parallel",
+    )
     parser.add_argument(
         "--env-file",
         type=str,
-        help="Path to the .env file to load environment variables from",
+        action="append",
+        help="Path to the .env file to load environment variables from (repeat to plot several repositories)",
+    )
+    parser.add_argument(
+        "--palette-file",
+        help="JSON file that pins label colors across runs and repositories (created if missing)",
     )
     args = parser.parse_args()
 
-    try:
-        env = load_github_env_vars(args.env_file)
-    except ValueError as e:
-        print(f"Error loading environment variables: {e}")
-        return 1
-
+    charts = []
+    for env_file in args.env_file or [None]:
+        try:
+            env = load_github_env_vars(env_file) if env_file else load_github_env_vars()
+        except ValueError as e:
+            print(f"Error loading environment variables: {e}")
+            return 1
+        charts.extend(chart_tasks(env, args.input_dir, start_date=args.start, exclude_labels=args.exclude_labels))
+
+    render_charts(charts, jobs=args.jobs, palette_file=args.palette_file)
+
+
+def load_summary(input_dir, prefix, kind):
+    """Load one summary file, or return None if it was not generated.
+
+    Prefers the typed columnar files (no parsing or type inference) over CSV, unless the CSV
+    is newer, i.e. the columnar copy is left over from an earlier run.
+    """
+    candidates = []
+    for preference, fmt in enumerate(SUMMARY_LOAD_ORDER):
+        path = os.path.join(input_dir, f"{prefix}.{kind}{FORMAT_SUFFIXES[fmt]}")
+        if os.path.exists(path) and (fmt == "csv" or pyarrow is not None):
+            candidates.append((os.path.getmtime(path), -preference, fmt, path))
+    if not candidates:
+        return None
+
+    _, _, fmt, path = max(candidates)
+    logging.debug(f"Loading {path}")
+    if fmt == "feather":
+        return pd.read_feather(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def chart_tasks(env, input_dir=None, start_date=None, exclude_labels=None, frames=None):
+    """Return one picklable, zero-argument callable per chart for the repo in `env`.
+
+    Charts are drawn from `frames` ({table: {kind: DataFrame}}, as returned by
+    `generate_summary.build_summary_frames`) when given, otherwise every summary file in
+    `input_dir` is loaded once here and shared by the charts that need it.
+    """
+    def summary(table, kind):
+        if frames is not None:
+            return frames.get(table, {}).get(kind)
+        return load_summary(input_dir, f"{env['REPO_OWNER']}_{env['REPO_NAME']}_{table}", kind)
+
+    charts = []
     table_names = ["issues", "pull_requests"]
     for table in table_names:
         prefix = f"{env['REPO_OWNER']}_{env['REPO_NAME']}_{table}"
-        monthly_csv = os.path.join(args.input_dir, f"{prefix}.monthly_summary.csv")
-        if os.path.exists(monthly_csv):
+        monthly_df = summary(table, "monthly_summary")
+        if monthly_df is not None:
             output_path = os.path.join(OUTPUT_DIR, f"{prefix}.monthly_issues_trend.png")
-            plot_monthly_summary_basic(monthly_csv, table, output_path, start_date=args.start)
+            charts.append(functools.partial(plot_monthly_summary_basic, monthly_df, table, output_path,
+                                            start_date=start_date))
 
             n = 5
             output_path = os.path.join(OUTPUT_DIR, f"{prefix}.integrations.top_{n}.monthly_trend.png")
-            plot_integration_trends(monthly_csv,
-                                    table,
-                                    output_path,
-                                    top_n=n,
-                                    start_date=args.start,
-                                    exclude_labels=args.exclude_labels)
-
-        label_breakdown_csv = os.path.join(args.input_dir, f"{prefix}.label_breakdown.csv")
-        if os.path.exists(label_breakdown_csv):
+            charts.append(functools.partial(plot_integration_trends,
+                                            monthly_df,
+                                            table,
+                                            output_path,
+                                            top_n=n,
+                                            start_date=start_date,
+                                            exclude_labels=exclude_labels))
+
+        label_breakdown_df = summary(table, "label_breakdown")
+        if label_breakdown_df is not None:
             output_path = os.path.join(OUTPUT_DIR, f"{prefix}.top_labels.png")
-            plot_label_breakdown(
-                label_breakdown_csv,
+            charts.append(functools.partial(
+                plot_label_breakdown,
+                label_breakdown_df,
                 table,
                 output_path,
-                start_date=args.start,
-                exclude_labels=args.exclude_labels
-            )
+                start_date=start_date,
+                exclude_labels=exclude_labels
+            ))
 
-        open_by_label_csv = os.path.join(args.input_dir, f"{prefix}.label_counts.csv")
-        if os.path.exists(open_by_label_csv):
+        label_counts_df = summary(table, "label_counts")
+        if label_counts_df is not None:
             output_path = os.path.join(OUTPUT_DIR, f"{prefix}.label_counts.png")
-            plot_label_count(
-                open_by_label_csv,
+            charts.append(functools.partial(
+                plot_label_count,
+                label_counts_df,
                 table,
                 output_path,
-                start_date=args.start,
-                exclude_labels=args.exclude_labels
-            )
+                start_date=start_date,
+                exclude_labels=exclude_labels
+            ))
 
-        open_by_label_csv = os.path.join(args.input_dir, f"{prefix}.open_by_label.csv")
-        if os.path.exists(os.path.join(args.input_dir, open_by_label_csv)):
+        open_by_label_df = summary(table, "open_by_label")
+        if open_by_label_df is not None:
             output_path = os.path.join(OUTPUT_DIR, f"{prefix}.open_closed_total_label_count.png")
-            plot_label_state_counts(
-                open_by_label_csv,
+            charts.append(functools.partial(
+                plot_label_state_counts,
+                open_by_label_df,
                 table,
                 output_path,
                 top_n=30,
-                exclude_labels=args.exclude_labels
-            )
+                exclude_labels=exclude_labels
+            ))
+
+    discussions_df = summary("discussions", "monthly_summary")
+    if discussions_df is not None:
+        prefix = f"{env['REPO_OWNER']}_{env['REPO_NAME']}_discussions"
+        output_path = os.path.join(OUTPUT_DIR, f"{prefix}.monthly_trend.png")
+        charts.append(functools.partial(plot_discussions_trend, discussions_df, "discussions", output_path,
+                                        start_date=start_date))
+        output_path = os.path.join(OUTPUT_DIR, f"{prefix}.categories.png")
+        charts.append(functools.partial(plot_discussion_categories, discussions_df, "discussions", output_path,
+                                        start_date=start_date))
+    return charts
+
+
+def init_worker(palette_file=None):
+    setup_logger()
+    setup_styles()
+    load_palette(palette_file)
 
 
-def get_label_color(label_name):
-    if label_name in COLOR_MAP:
-        return COLOR_MAP[label_name]
+def render_chart(chart):
+    chart()
+    get_palette().save()
 
-    all_colors = list(mcolors.CSS4_COLORS.values())
-    seed = int(hashlib.md5(label_name.encode()).hexdigest(), 16)
-    random.seed(seed)
-    return random.choice(all_colors)
 
+def render_charts(charts, jobs=1, palette_file=None):
+    """Render `charts` (see `chart_tasks`), in a process pool when `jobs` > 1.
 
-def plot_monthly_summary_basic(path, table, output_path, start_date=None):
+    Charts are CPU-bound (layout and PNG encoding) and only use the object-oriented Figure API,
+    so they share no pyplot state and can be rendered in any order.
+    """
+    jobs = max(1, min(jobs or 1, len(charts)))
+    if jobs == 1:
+        setup_styles()
+        load_palette(palette_file)
+        for chart in charts:
+            render_chart(chart)
+        return
+
+    logging.info(f"Rendering {len(charts)} charts with {jobs} workers...")
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(palette_file,)) as executor:
+        futures = {executor.submit(render_chart, chart): chart for chart in charts}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logging.warning(f"Could not render {futures[future].args[2]}: {e}")
+
+
+def generate_plots(env, input_dir=None, start_date=None, exclude_labels=None, jobs=1, palette_file=None,
+                   frames=None):
+    """Render every chart for the repo in `env`, from in-memory summary `frames` or the files in `input_dir`."""
+    render_charts(chart_tasks(env, input_dir, start_date=start_date, exclude_labels=exclude_labels, frames=frames),
+                  jobs=jobs, palette_file=palette_file)
+
+
+def plot_monthly_summary_basic(df, table, output_path, start_date=None):
     try:
-        df = pd.read_csv(path)
         if start_date:
             df = df[df["month"] >= start_date]
-        df["month"] = pd.to_datetime(df["month"])
+        df = df.assign(month=pd.to_datetime(df["month"]))
 
-        plt.figure(figsize=(12, 6))
+        fig = Figure(figsize=(12, 6))
+        ax = fig.subplots()
 
         open_key = f"open_{table}"
-        plt.plot(df["month"], df[open_key], label=f"Open {table}", color=COLOR_MAP.get(open_key), linewidth=3,
-                 marker='o')
-        plt.xticks(rotation=45)  # Rotate month labels
+        ax.plot(df["month"], df[open_key], label=f"Open {table}", color=COLOR_MAP.get(open_key), linewidth=3,
+                marker='o')
+        ax.tick_params(axis="x", labelrotation=45)  # Rotate month labels
 
         closed_key = f"closed_{table}"
-        plt.plot(df["month"], df[closed_key], label=f"Closed {table}",
-                 color=COLOR_MAP.get(closed_key),
-                 linewidth=3,
-                 marker='o')
-        plt.plot(df["month"],
-                 df["type: bug"],
-                 label="Bugs",
-                 color=COLOR_MAP.get("type: bug"),
-                 linewidth=2,
-                 linestyle="--")
-        plt.plot(df["month"], df["type: feature"], label="Features", color=COLOR_MAP.get("type: feature"),
-                 linewidth=2, linestyle="--")
-        plt.plot(df["month"], df["type: enhancement"],
-                 label="Enhancements",
-                 color=COLOR_MAP.get("type: enhancement"),
-                 linewidth=2,
-                 linestyle="--")
-
-        plt.title(f"Monthly GitHub Trends ({table})", fontsize=16)
-        ax = plt.gca()
+        ax.plot(df["month"], df[closed_key], label=f"Closed {table}",
+                color=COLOR_MAP.get(closed_key),
+                linewidth=3,
+                marker='o')
+        ax.plot(df["month"],
+                df["type: bug"],
+                label="Bugs",
+                color=COLOR_MAP.get("type: bug"),
+                linewidth=2,
+                linestyle="--")
+        ax.plot(df["month"], df["type: feature"], label="Features", color=COLOR_MAP.get("type: feature"),
+                linewidth=2, linestyle="--")
+        ax.plot(df["month"], df["type: enhancement"],
+                label="Enhancements",
+                color=COLOR_MAP.get("type: enhancement"),
+                linewidth=2,
+                linestyle="--")
+
+        ax.set_title(f"Monthly GitHub Trends ({table})", fontsize=16)
         set_axis_labels(ax, "Month", "Count")
 
-        plt.legend()
-        plt.tight_layout()
+        ax.legend()
+        fig.tight_layout()
 
-        plt.savefig(output_path)
+        fig.savefig(output_path)
         logging.info(f"Saved plot to {output_path}")
-        plt.close()
     except Exception as e:
         logging.warning(f"[{table}] Could not generate monthly trend plot: {e}")
 
 
-def plot_integration_trends(csv_path, table, output_path, start_date=None, exclude_labels=None, top_n=5):
-    # Load the CSV data into a DataFrame
-    df = pd.read_csv(csv_path)
-
+def plot_integration_trends(df, table, output_path, start_date=None, exclude_labels=None, top_n=5):
     if start_date:
         df = df[df["month"] >= start_date]
 
@@ -209,7 +294,7 @@ def plot_integration_trends(csv_path, table, output_path, start_date=None, exclu
             label_cols.append(col)
 
     # Build exclusion set
-    exclude_set = set(exclude_labels) if exclude_labels else set()
+    exclude_set = set(label.strip() for label in exclude_labels.split(",")) if exclude_labels else set()
     for non_label in ['month', 'open_issues', 'closed_issues']:
         if non_label in df.columns:
             exclude_set.add(non_label)
@@ -232,7 +317,8 @@ def plot_integration_trends(csv_path, table, output_path, start_date=None, exclu
         return
 
     # Create a wider figure to allocate room for the legend
-    fig, ax = plt.subplots(figsize=(14, 6))
+    fig = Figure(figsize=(14, 6))
+    ax = fig.subplots()
     df.plot(x='month', y=label_cols, marker='o', ax=ax)
 
     ax.yaxis.set_major_locator(MaxNLocator(integer=True))
@@ -254,18 +340,15 @@ def plot_integration_trends(csv_path, table, output_path, start_date=None, exclu
         # borderpad=0.8  # Padding inside the legend box
     )
 
-    plt.xticks(rotation=45)
-    plt.tight_layout(rect=[0, 0, 0.96, 1])  # Reserve 20% for legend
+    ax.tick_params(axis="x", labelrotation=45)
+    fig.tight_layout(rect=[0, 0, 0.96, 1])  # Reserve 20% for legend
 
-    plt.savefig(output_path)
+    fig.savefig(output_path)
     logging.info(f"Saved plot to {output_path}")
-    plt.close()
 
 
-def plot_label_breakdown(path, table, output_path, top_n=20, start_date=None, exclude_labels=None):
+def plot_label_breakdown(df, table, output_path, top_n=20, start_date=None, exclude_labels=None):
     try:
-        df = pd.read_csv(path)
-
         if "month" in df.columns and start_date:
             df = df[df["month"] >= start_date]
 
@@ -276,25 +359,23 @@ def plot_label_breakdown(path, table, output_path, top_n=20, start_date=None, ex
         df = df.sort_values("count", ascending=False).head(top_n)
         colors = [get_label_color(label) for label in df["label_name"]]
 
-        plt.figure(figsize=(10, 6))
-        plt.barh(df["label_name"], df["count"], color=colors)
-        plt.title(f"Top {top_n} Labels by Frequency ({table})", fontsize=16)
-        ax = plt.gca()
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        ax.barh(df["label_name"], df["count"], color=colors)
+        ax.set_title(f"Top {top_n} Labels by Frequency ({table})", fontsize=16)
         set_axis_labels(ax, "Count", "Label")
         ax.invert_yaxis()
-        plt.tight_layout()
+        fig.tight_layout()
 
-        plt.savefig(output_path)
+        fig.savefig(output_path)
         logging.info(f"Saved plot to {output_path}")
-        plt.close()
     except Exception as e:
         logging.warning(f"[{table}] Could not generate label breakdown plot: {e}")
 
 
-def plot_label_count(path, table, output_path, top_n=8, start_date=None, exclude_labels=None):
+def plot_label_count(df, table, output_path, top_n=8, start_date=None, exclude_labels=None):
     try:
-        df = pd.read_csv(path)
-        df["month"] = df["month"].astype(str)
+        df = df.assign(month=df["month"].astype(str))
 
         if start_date:
             df = df[df["month"] >= start_date]
@@ -323,24 +404,21 @@ def plot_label_count(path, table, output_path, top_n=8, start_date=None, exclude
         n_labels = len(top_labels)
         bar_group_width = 0.8
         bar_width = bar_group_width / n_labels
-        offsets = [(j - (n_labels - 1) / 2) * bar_width for j in range(n_labels)]
+        offsets = (np.arange(n_labels) - (n_labels - 1) / 2) * bar_width
+
+        # Within each month, bars are ordered by ascending count: rank every cell of the
+        # (months x labels) matrix at once instead of sorting each row per label.
+        counts = pivot_df.to_numpy()
+        ranks = np.argsort(np.argsort(counts, axis=1), axis=1)
+        x_positions = np.arange(len(months))[:, np.newaxis] + offsets[ranks]
 
         colors = {label: get_label_color(label) for label in top_labels}
 
-        fig, ax = plt.subplots(figsize=(14, 7))
-
-        for label in top_labels:
-            x_positions = []
-            heights = []
-            for month_index, month in enumerate(months):
-                row = pivot_df.loc[month]
-                sorted_labels = row.sort_values().index.tolist()
-                if label in sorted_labels:
-                    pos = sorted_labels.index(label)
-                    x = month_index + offsets[pos]
-                    x_positions.append(x)
-                    heights.append(row[label])
-            ax.bar(x_positions, heights, width=bar_width, label=label, color=colors[label])
+        fig = Figure(figsize=(14, 7))
+        ax = fig.subplots()
+
+        for j, label in enumerate(top_labels):
+            ax.bar(x_positions[:, j], counts[:, j], width=bar_width, label=label, color=colors[label])
 
         # Axes styling
         ax.set_xticks(np.arange(len(months)))
@@ -363,19 +441,16 @@ def plot_label_count(path, table, output_path, top_n=8, start_date=None, exclude
             borderaxespad=0.
         )
 
-        plt.tight_layout()
-        plt.savefig(output_path)
+        fig.tight_layout()
+        fig.savefig(output_path)
         logging.info(f"Saved plot to {output_path}")
-        plt.close()
 
     except Exception as e:
         logging.warning(f"[{table}] Could not generate label time-series bar chart: {e}")
 
 
-def plot_label_state_counts(path, table, output_path, top_n, exclude_labels=None):
+def plot_label_state_counts(df, table, output_path, top_n, exclude_labels=None):
     try:
-        df = pd.read_csv(path)
-
         if exclude_labels:
             exclude_set = set(label.strip() for label in exclude_labels.split(","))
             df = df[~df["label_name"].isin(exclude_set)]
@@ -383,11 +458,12 @@ def plot_label_state_counts(path, table, output_path, top_n, exclude_labels=None
         df = df[df["label_name"].str.startswith(("source:", "transform:", "sink:"))]
 
         # Add total count column and sort
-        df["total"] = df["open_count"] + df["closed_count"]
+        df = df.assign(total=df["open_count"] + df["closed_count"])
         df = df.sort_values("total", ascending=False).head(top_n)
 
         # Plot
-        fig, ax = plt.subplots(figsize=(12, 6))
+        fig = Figure(figsize=(12, 6))
+        ax = fig.subplots()
         ax.barh(df["label_name"], df["closed_count"], label="Closed", color="black")
         ax.barh(df["label_name"], df["open_count"], left=df["closed_count"], label="Open", color="green")
 
@@ -395,15 +471,75 @@ def plot_label_state_counts(path, table, output_path, top_n, exclude_labels=None
 
         ax.set_title(f"Top {top_n} Integrations Label Count ({table})", fontsize=16)
         ax.legend(loc="lower right")
-        plt.tight_layout()
-        plt.gca().invert_yaxis()  # highest total on top
+        fig.tight_layout()
+        ax.invert_yaxis()  # highest total on top
 
-        plt.savefig(output_path)
+        fig.savefig(output_path)
         logging.info(f"Saved plot to {output_path}")
-        plt.close()
     except Exception as e:
         logging.warning(f"[{table}] Could not generate label count chart: {e}")
 
 
+def plot_discussions_trend(df, table, output_path, start_date=None):
+    try:
+        if start_date:
+            df = df[df["month"] >= start_date]
+        df = df.assign(month=pd.to_datetime(df["month"]))
+
+        fig = Figure(figsize=(12, 6))
+        ax = fig.subplots()
+        ax.plot(df["month"], df["discussions"], label="Discussions", color="#070707", linewidth=3, marker='o')
+        ax.plot(df["month"], df["answered"], label="Answered", color="#27b01c", linewidth=2, linestyle="--")
+        ax.plot(df["month"], df["unanswered"], label="Unanswered", color="#FF4C4C", linewidth=2, linestyle="--")
+        ax.tick_params(axis="x", labelrotation=45)
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+
+        ax.set_title(f"Monthly GitHub Trends ({table})", fontsize=16)
+        set_axis_labels(ax, "Month", "Count")
+
+        ax.legend()
+        fig.tight_layout()
+
+        fig.savefig(output_path)
+        logging.info(f"Saved plot to {output_path}")
+    except Exception as e:
+        logging.warning(f"[{table}] Could not generate discussions trend plot: {e}")
+
+
+def plot_discussion_categories(df, table, output_path, start_date=None):
+    try:
+        if start_date:
+            df = df[df["month"] >= start_date]
+
+        # Category columns follow the total and answered/unanswered columns, largest first.
+        categories = [col for col in df.columns if col not in ("month", "discussions", "answered", "unanswered")]
+        categories = [col for col in categories if df[col].sum() > 0]
+        if not categories:
+            logging.info(f"[{table}] No discussions in the selected range, skipping category chart.")
+            return
+
+        fig = Figure(figsize=(14, 6))
+        ax = fig.subplots()
+        x = np.arange(len(df))
+        bottom = np.zeros(len(df))
+        for category in categories:
+            counts = df[category].to_numpy()
+            ax.bar(x, counts, bottom=bottom, label=category, color=get_label_color(category))
+            bottom += counts
+
+        ax.set_xticks(x)
+        ax.set_xticklabels(df["month"], rotation=45)
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+        set_axis_labels(ax, "Month", "Count")
+        ax.set_title(f"Discussions by Category ({table})", fontsize=16)
+        ax.legend(title="Category", bbox_to_anchor=(1.01, 1), loc='upper left', borderaxespad=0.)
+
+        fig.tight_layout()
+        fig.savefig(output_path)
+        logging.info(f"Saved plot to {output_path}")
+    except Exception as e:
+        logging.warning(f"[{table}] Could not generate discussion category chart: {e}")
+
+
 if __name__ == "__main__":
     main()
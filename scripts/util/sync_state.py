@@ -0,0 +1,51 @@
+import json
+import logging
+import os
+
+
+class IncompleteFetchError(RuntimeError):
+    """Raised when a fetch stops before it has seen every item it was asked for.
+
+    Archives and high-water marks must only be updated after a complete walk: a truncated one
+    would drop items from the archive or move the high-water mark past items never fetched.
+    """
+
+
+def sync_state_path(output_dir, repo_owner, repo_name):
+    return os.path.join(output_dir, f"{repo_owner}_{repo_name}_sync_state.json")
+
+
+def load_sync_state(path):
+    """Return the state saved by the last successful sync at `path`, or None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Ignoring unreadable sync state {path}: {e}")
+        return None
+
+
+def save_sync_state(path, state):
+    with open(path, "w") as f:
+        json.dump(state, f, indent=4)
+
+
+def max_updated_at(items, current=None, field="updated_at"):
+    """Return the max `field` timestamp across `items` and `current`.
+    ISO 8601 UTC timestamps ("2025-04-28T17:12:01Z") sort lexicographically."""
+    timestamps = [item[field] for item in items if item.get(field)]
+    if current:
+        timestamps.append(current)
+    return max(timestamps) if timestamps else None
+
+
+def merge_items(existing, delta, key):
+    """Merge freshly fetched items into a stream of archived ones, replacing entries by `key`.
+    Updated and new items come first (highest number first), followed by the untouched archived items."""
+    updated = {item[key] for item in delta}
+    yield from sorted(delta, key=lambda item: item.get("number", 0), reverse=True)
+    for item in existing:
+        if item[key] not in updated:
+            yield item